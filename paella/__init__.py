@@ -9,9 +9,51 @@ from .files import *
 from .func import *
 from .text import *
 from .log import *
-from .platform import *
-from .setup import *
-from .contrib.version import Version
+
+#----------------------------------------------------------------------------------------------
+
+# Heavier submodules are imported on first access to any of their names (PEP 562), so that
+# scripts that only use the basic utilities do not pay for them.
+
+_lazy_modules = {
+    'platform': ['DEBIAN_VERSIONS', 'UBUNTU_VERSIONS', 'MACOS_VERSIONS', 'DARWIN_VERSIONS',
+                 'MACOS_VERSIONS_NICKS', 'DARWIN_VERSIONS_NICKS', 'Platform', 'OnPlatform'],
+    'setup': ['GIT_LFS_VER', 'OutputMode', 'Runner', 'PackageManager', 'rpm_installed_packages',
+              'Yum', 'Dnf', 'TDnf', 'Apt', 'Zypper', 'Pacman', 'Brew', 'Pkg', 'Alpine', 'Setup'],
+    'cache': ['cache_dir', 'sha256sum', 'file_lock', 'DownloadCache', 'cached_download'],
+    'tasks': ['task'],
+    'journal': ['no_journal'],
+    'contrib.version': ['Version'],
+    'versions': ['VersionSet'],
+    'tags': ['GithubTags', 'GitRemoteTags', 'tag_source'],
+}
+
+_lazy_submodules = ['platform', 'setup', 'cache', 'shell', 'tasks', 'trace', 'journal', 'bundle', 'versions', 'tags', 'contrib']
+
+_lazy_names = {name: module for module, names in _lazy_modules.items() for name in names}
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        import importlib
+        if name in _lazy_names:
+            value = getattr(importlib.import_module('.' + _lazy_names[name], __name__), name)
+        elif name in _lazy_submodules:
+            value = importlib.import_module('.' + name, __name__)
+        else:
+            raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(_lazy_names) | set(_lazy_submodules))
+else:
+    from .cache import *
+    from .platform import *
+    from .setup import *
+    from .tasks import task
+    from .contrib.version import Version
+    from .versions import VersionSet
+    from .tags import GithubTags, GitRemoteTags, tag_source
 
 #----------------------------------------------------------------------------------------------
 
@@ -40,3 +82,8 @@ Global.noctor = noctor
 Global.foldl = foldl
 Global.foldr = foldr
 Global.ENV = Env()
+
+#----------------------------------------------------------------------------------------------
+
+# 'from paella import *' also imports the lazily-loaded names
+__all__ = [name for name in globals() if not name.startswith('_')] + list(_lazy_names)
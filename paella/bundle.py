@@ -0,0 +1,133 @@
+
+import glob
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+from .cache import file_lock
+from .files import fread, fwrite, mkdir_p
+from .error import *
+
+#----------------------------------------------------------------------------------------------
+
+# A bundle holds everything a setup script fetches, so it can be replayed without network:
+#
+#   manifest.json       package installation requests, and where their packages are
+#   packages/<type>/N/  packages (.deb/.rpm) downloaded for installation request N
+#   downloads/          download cache (see paella.cache)
+#   wheels/             pip packages
+#
+# Bundles are recorded with Setup(record=path) or READIES_BUNDLE_RECORD=path, and replayed
+# with Setup(replay=path) or READIES_BUNDLE_REPLAY=path. If path ends with .tar/.tgz/.tar.gz,
+# the bundle is kept as a tarball.
+# The bundle directory is passed to child processes via the environment, so setup scripts
+# invoked by a setup script record into (or replay from) the same bundle.
+
+TARBALL_SUFFIXES = ('.tar', '.tgz', '.tar.gz')
+
+class Bundle:
+    def __init__(self, path, mode):
+        if mode not in ['record', 'replay']:
+            raise Error("invalid bundle mode: %s" % mode)
+        self.mode = mode
+        self.archive = None
+        path = os.path.abspath(path)
+        if path.endswith(TARBALL_SUFFIXES):
+            self.archive = path
+            self.dir = tempfile.mkdtemp(prefix='readies-bundle.')
+            if mode == 'replay':
+                with tarfile.open(path) as tar:
+                    if hasattr(tarfile, 'data_filter'):
+                        tar.extractall(self.dir, filter='data')
+                    else:
+                        tar.extractall(self.dir)
+        else:
+            self.dir = path
+            mkdir_p(self.dir)
+        self.manifest_file = os.path.join(self.dir, 'manifest.json')
+        self._index = None
+
+    @property
+    def recording(self):
+        return self.mode == 'record'
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    @property
+    def downloads_dir(self):
+        return os.path.join(self.dir, 'downloads')
+
+    @property
+    def wheels_dir(self):
+        dir = os.path.join(self.dir, 'wheels')
+        mkdir_p(dir)
+        return dir
+
+    #------------------------------------------------------------------------------------------
+
+    def _manifest(self):
+        if not os.path.exists(self.manifest_file):
+            return {'packages': {}}
+        return json.loads(fread(self.manifest_file))
+
+    # returns a new (empty) directory for packages of an installation request
+    def new_packages_dir(self, type):
+        with file_lock(self.manifest_file + '.lock'):
+            base = os.path.join(self.dir, 'packages', type)
+            mkdir_p(base)
+            n = len(os.listdir(base)) + 1
+            dir = os.path.join(base, '%04d' % n)
+            mkdir_p(dir)
+        return dir
+
+    def add_packages(self, type, packs, dir):
+        with file_lock(self.manifest_file + '.lock'):
+            manifest = self._manifest()
+            manifest['packages'].setdefault(type, []).append(
+                {'packs': sorted(packs.split()), 'dir': os.path.relpath(dir, self.dir)})
+            fwrite(self.manifest_file + '.tmp', json.dumps(manifest, indent=1))
+            os.rename(self.manifest_file + '.tmp', self.manifest_file)
+            self._index = None
+
+    # Recorded packages are looked up by name, so installation requests need not match
+    # recorded ones (e.g. if batching, or the set of installed packages, differs).
+    # Returns (files, missing): package files of the recorded requests that include any of packs
+    # (each file once), and the names of packs that were not recorded.
+    def find_packages(self, type, packs):
+        if self._index is None:
+            self._index = {}
+            for t, reqs in self._manifest()['packages'].items():
+                index = self._index[t] = {}
+                for req in reqs:
+                    for pack in req['packs']:
+                        index.setdefault(pack, []).append(req['dir'])
+        index = self._index.get(type, {})
+        dirs = []
+        missing = []
+        for pack in packs.split():
+            if pack not in index:
+                missing.append(pack)
+            for dir in index.get(pack, []):
+                if dir not in dirs:
+                    dirs.append(dir)
+        files = {}
+        for dir in dirs:
+            for f in sorted(glob.glob(os.path.join(self.dir, dir, '*'))):
+                if f.endswith(('.deb', '.rpm')):
+                    files.setdefault(os.path.basename(f), f)
+        return sorted(files.values()), missing
+
+    #------------------------------------------------------------------------------------------
+
+    def close(self):
+        if self.archive is None:
+            return
+        if self.recording:
+            with tarfile.open(self.archive, 'w:' if self.archive.endswith('.tar') else 'w:gz') as tar:
+                for name in sorted(os.listdir(self.dir)):
+                    if not name.endswith('.lock'):
+                        tar.add(os.path.join(self.dir, name), arcname=name)
+        shutil.rmtree(self.dir, ignore_errors=True)
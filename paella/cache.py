@@ -0,0 +1,114 @@
+
+import fcntl
+import hashlib
+import os
+import shutil
+from contextlib import contextmanager
+from .files import download, fread, fwrite, mkdir_p
+from .error import *
+
+#----------------------------------------------------------------------------------------------
+
+# Root of readies' persistent caches: $READIES_CACHE_DIR, or $XDG_CACHE_HOME/readies
+# (which defaults to ~/.cache/readies).
+
+def cache_dir(*names):
+    root = ENV['READIES_CACHE_DIR']
+    if root == '':
+        root = os.path.join(ENV['XDG_CACHE_HOME', os.path.join('~', '.cache')], 'readies')
+    path = os.path.join(os.path.expanduser(root), *names)
+    mkdir_p(path)
+    return path
+
+#----------------------------------------------------------------------------------------------
+
+def sha256sum(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+@contextmanager
+def file_lock(path):
+    with open(path, 'a') as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(file, fcntl.LOCK_UN)
+
+#----------------------------------------------------------------------------------------------
+
+# Downloaded files are kept in <root>/<kk>/<key>/<file name>, where key is the sha256 of the URL.
+# root defaults to $READIES_DOWNLOAD_CACHE, or cache_dir('downloads').
+# While downloading, content goes to <file name>.part, so interrupted downloads can be resumed.
+# <file name>.sha256 holds the digest of the file, computed once it has been downloaded.
+
+class DownloadCache:
+    def __init__(self, root=None):
+        if root is None:
+            root = ENV['READIES_DOWNLOAD_CACHE'] or cache_dir('downloads')
+        self.root = root
+
+    def path(self, url):
+        from urllib.parse import urlparse
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        name = os.path.basename(urlparse(url).path) or 'download'
+        return os.path.join(self.root, key[0:2], key, name)
+
+    def digest(self, path):
+        digest_file = path + '.sha256'
+        if os.path.isfile(digest_file):
+            return fread(digest_file).strip()
+        digest = sha256sum(path)
+        fwrite(digest_file, digest)
+        return digest
+
+    # returns path of the cached file, downloading it if not present (or if refresh is True)
+    def get(self, url, sha256=None, refresh=False):
+        path = self.path(url)
+        mkdir_p(os.path.dirname(path))
+        if sha256 is not None:
+            sha256 = sha256.lower()
+        with file_lock(os.path.join(os.path.dirname(path), '.lock')):
+            if os.path.isfile(path) and not refresh:
+                if sha256 is None or self.digest(path) == sha256:
+                    return path
+            part = path + '.part'
+            resumed = not refresh and os.path.isfile(part)
+            download(url, part, resume=not refresh)
+            digest = sha256sum(part)
+            if sha256 is not None and digest != sha256 and resumed:
+                # the partial file may be stale: try again from scratch
+                download(url, part)
+                digest = sha256sum(part)
+            if sha256 is not None and digest != sha256:
+                os.remove(part)
+                raise Error("checksum mismatch for {URL}: expected {EXP}, got {GOT}".format(
+                    URL=url, EXP=sha256, GOT=digest))
+            fwrite(path + '.sha256', digest)
+            os.rename(part, path)
+        return path
+
+    def remove(self, url):
+        shutil.rmtree(os.path.dirname(self.path(url)), ignore_errors=True)
+
+#----------------------------------------------------------------------------------------------
+
+# Returns the path of the cached copy of url, or dest (a file or directory) into which
+# it is linked or copied.
+
+def cached_download(url, sha256=None, dest=None, refresh=False):
+    path = DownloadCache().get(url, sha256=sha256, refresh=refresh)
+    if dest is None:
+        return path
+    if os.path.isdir(dest):
+        dest = os.path.join(dest, os.path.basename(path))
+    if os.path.lexists(dest):
+        os.remove(dest)
+    try:
+        os.link(path, dest)
+    except OSError:
+        shutil.copyfile(path, dest)
+    return os.path.abspath(dest)
@@ -28,6 +28,14 @@ import re
 import warnings
 
 
+try:
+    _lru_cache = functools.lru_cache
+except AttributeError:
+    # Python 2: no parse cache
+    def _lru_cache(maxsize=None):
+        return lambda f: f
+
+
 def _has_leading_zero(value):
     return (value
             and value[0] == '0'
@@ -97,7 +105,43 @@ class AlphaIdentifier(object):
             return NotImplemented
 
 
+# Sort keys are plain tuples, so that sorting and comparing versions does not allocate
+# identifier objects: numeric prerelease identifiers sort before alphanumeric ones, and
+# versions without prerelease sort after those with one (see precedence_key).
+_NO_PRERELEASE_KEY = ((2,),)
+
+
+def _sort_key(major, minor, patch, prerelease):
+    if prerelease:
+        prerelease_key = tuple(
+            (0, int(part)) if part.isdigit() else (1, part.encode('ascii'))
+            for part in prerelease
+        )
+    else:
+        prerelease_key = _NO_PRERELEASE_KEY
+    return (
+        0 if major is None else major,
+        0 if minor is None else minor,
+        0 if patch is None else patch,
+        prerelease_key,
+    )
+
+
+PARSE_CACHE_SIZE = 32768
+
+
+# Version strings are parsed once: returns (components, sort key).
+@_lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _cached_parse(cls, version_string, partial):
+    components = cls._parse(version_string, partial)
+    return components, _sort_key(*components[0:4])
+
+
 class Version(object):
+    __slots__ = ['major', 'minor', 'patch', 'prerelease', 'build', 'partial', '_key']
+
+    # fields the sort key depends on: assigning any of them drops the key (see sort_key)
+    _key_fields = frozenset(['major', 'minor', 'patch', 'prerelease'])
 
     version_re = re.compile(r'^(\d+)\.(\d+)\.(\d+)(?:-([0-9a-zA-Z.-]+))?(?:\+([0-9a-zA-Z.-]+))?$')
     partial_version_re = re.compile(r'^(\d+)(?:\.(\d+)(?:\.(\d+))?)?(?:-([0-9a-zA-Z.-]*))?(?:\+([0-9a-zA-Z.-]*))?$')
@@ -117,13 +161,15 @@ class Version(object):
             raise ValueError("Call either Version('1.2.3') or Version(major=1, ...).")
 
         if has_text:
-            major, minor, patch, prerelease, build = self.parse(version_string, partial)
+            (major, minor, patch, prerelease, build), key = _cached_parse(
+                self.__class__, version_string, partial)
         else:
             # Convenience: allow to omit prerelease/build.
             prerelease = tuple(prerelease or ())
             if not partial:
                 build = tuple(build or ())
             self._validate_kwargs(major, minor, patch, prerelease, build, partial)
+            key = _sort_key(major, minor, patch, prerelease)
 
         self.major = major
         self.minor = minor
@@ -132,6 +178,7 @@ class Version(object):
         self.build = build
 
         self.partial = partial
+        self._key = key
 
     @classmethod
     def _coerce(cls, value, allow_none=False):
@@ -308,12 +355,61 @@ class Version(object):
         """Parse a version string into a tuple of components:
            (major, minor, patch, prerelease, build).
 
+        Results are cached (up to PARSE_CACHE_SIZE strings).
+
         Args:
             version_string (str), the version string to parse
             partial (bool), whether to accept incomplete input
             coerce (bool), whether to try to map the passed in string into a
                 valid Version.
         """
+        return _cached_parse(cls, version_string, partial)[0]
+
+    @classmethod
+    def key_of(cls, version_string, partial=True):
+        """Return the sort key of a version string, or None if it is not a
+        valid version."""
+        try:
+            return _cached_parse(cls, version_string, partial)[1]
+        except (ValueError, TypeError):
+            return None
+
+    @classmethod
+    def sort_strings(cls, strings, reverse=False, key=None, partial=True):
+        """Sort strings by version, without constructing Version objects.
+
+        Args:
+            strings (iterable of str), the strings to sort
+            reverse (bool), whether to sort from the highest version
+            key (callable), maps each string to its version string (or None);
+                by default, strings are version strings themselves
+            partial (bool), whether to accept incomplete versions
+
+        Strings that hold no valid version are dropped.
+        """
+        keyed = cls._keyed(strings, key, partial)
+        keyed.sort(key=lambda ks: ks[0], reverse=reverse)
+        return [s for _, s in keyed]
+
+    @classmethod
+    def max_of(cls, strings, key=None, partial=True):
+        """Return the string with the highest version (see sort_strings), or
+        None if there is none. Among strings with equal versions, the greatest
+        string is returned."""
+        keyed = cls._keyed(strings, key, partial)
+        return max(keyed)[1] if keyed else None
+
+    @classmethod
+    def _keyed(cls, strings, key, partial):
+        keyed = []
+        for s in strings:
+            k = cls.key_of(s if key is None else key(s), partial)
+            if k is not None:
+                keyed.append((k, s))
+        return keyed
+
+    @classmethod
+    def _parse(cls, version_string, partial=True):
         if not version_string:
             raise ValueError('Invalid empty version string: %r' % version_string)
 
@@ -418,11 +514,24 @@ class Version(object):
             ', partial=True' if self.partial else '',
         )
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self._key_fields:
+            object.__setattr__(self, '_key', None)
+
     def __hash__(self):
         # We don't include 'partial', since this is strictly equivalent to having
         # at least a field being `None`.
         return hash((self.major, self.minor, self.patch, self.prerelease, self.build))
 
+    @property
+    def sort_key(self):
+        """A tuple that orders versions by precedence (like precedence_key),
+        computed once per version string (and again after fields are assigned)."""
+        if self._key is None:
+            self._key = _sort_key(self.major, self.minor, self.patch, self.prerelease)
+        return self._key
+
     @property
     def precedence_key(self):
         def denone(n):
@@ -476,19 +585,19 @@ class Version(object):
     def __lt__(self, other):
         if not isinstance(other, self.__class__):
             return NotImplemented
-        return self.precedence_key < other.precedence_key
+        return self.sort_key < other.sort_key
 
     def __le__(self, other):
         if not isinstance(other, self.__class__):
             return NotImplemented
-        return self.precedence_key <= other.precedence_key
+        return self.sort_key <= other.sort_key
 
     def __gt__(self, other):
         if not isinstance(other, self.__class__):
             return NotImplemented
-        return self.precedence_key > other.precedence_key
+        return self.sort_key > other.sort_key
 
     def __ge__(self, other):
         if not isinstance(other, self.__class__):
             return NotImplemented
-        return self.precedence_key >= other.precedence_key
+        return self.sort_key >= other.sort_key
@@ -5,11 +5,7 @@ import os
 import os.path
 import shutil
 import sys
-import tempfile
-try:
-    from urllib2 import urlopen
-except:
-    from urllib.request import urlopen
+import threading
 
 #----------------------------------------------------------------------------------------------
 
@@ -31,6 +27,7 @@ def flines(fname, mode = 'r'):
 #----------------------------------------------------------------------------------------------
 
 def tempfilepath(prefix=None, suffix=None):
+    import tempfile
     if sys.version_info < (3, 0):
         if prefix is None:
             prefix = ''
@@ -42,7 +39,147 @@ def tempfilepath(prefix=None, suffix=None):
 
 #----------------------------------------------------------------------------------------------
 
-def wget(url, dest="", tempdir=False):
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT = 60
+
+# HTTP(S) connections are kept open per thread and host, and reused by subsequent requests.
+# Proxies are taken from the environment (http_proxy, https_proxy, no_proxy), as with urlopen:
+# HTTPS connections are tunneled through the proxy (CONNECT), while HTTP requests are sent to
+# the proxy with the absolute URL.
+# (urllib and http.client are imported on first use, as they take a while to load)
+
+_connections = threading.local()
+
+# Returns (netloc, headers) of the proxy for scheme://netloc, or None if there is none.
+def _proxy(scheme, netloc):
+    import base64
+    from urllib.parse import urlparse, unquote
+    from urllib.request import getproxies, proxy_bypass
+    proxy = getproxies().get(scheme)
+    if not proxy:
+        return None
+    host = netloc.rsplit('@', 1)[-1]
+    if proxy_bypass(host):
+        return None
+    if '://' not in proxy:
+        proxy = 'http://' + proxy
+    u = urlparse(proxy)
+    headers = {}
+    if u.username is not None:
+        auth = '%s:%s' % (unquote(u.username), unquote(u.password or ''))
+        headers['Proxy-Authorization'] = 'Basic ' + base64.b64encode(auth.encode('utf-8')).decode('ascii')
+    return u.hostname + (':%d' % u.port if u.port else ''), headers
+
+def _connection(scheme, netloc):
+    import http.client as http_client
+    pool = getattr(_connections, 'pool', None)
+    if pool is None:
+        pool = _connections.pool = {}
+    conn = pool.get((scheme, netloc))
+    if conn is None:
+        klass = http_client.HTTPSConnection if scheme == 'https' else http_client.HTTPConnection
+        proxy = _proxy(scheme, netloc)
+        if proxy is None:
+            conn = klass(netloc, timeout=DOWNLOAD_TIMEOUT)
+            conn.proxy_headers = None
+        elif scheme == 'https':
+            conn = klass(proxy[0], timeout=DOWNLOAD_TIMEOUT)
+            conn.set_tunnel(netloc, headers=proxy[1])
+            conn.proxy_headers = None
+        else:
+            conn = klass(proxy[0], timeout=DOWNLOAD_TIMEOUT)
+            conn.proxy_headers = proxy[1]
+        pool[(scheme, netloc)] = conn
+    return conn
+
+def _drop_connection(scheme, netloc):
+    conn = _connections.pool.pop((scheme, netloc), None)
+    if conn is not None:
+        conn.close()
+
+# Issues a GET request (following redirects) and returns the response, which should be read
+# to its end before the next request is issued by the same thread.
+# Schemes other than http/https are handled by urlopen.
+def http_get(url, headers={}, max_redirects=10):
+    import http.client as http_client
+    import socket
+    from urllib.error import HTTPError
+    from urllib.parse import urlparse, urljoin
+    from urllib.request import urlopen, Request
+    for i in range(0, max_redirects + 1):
+        u = urlparse(url)
+        if u.scheme not in ['http', 'https']:
+            return urlopen(Request(url, headers=headers), timeout=DOWNLOAD_TIMEOUT)
+        path = (u.path or '/') + ('?' + u.query if u.query else '')
+        hdrs = {'User-Agent': 'readies', 'Accept-Encoding': 'identity'}
+        hdrs.update(headers)
+        for attempt in [1, 2]:
+            conn = _connection(u.scheme, u.netloc)
+            try:
+                if conn.proxy_headers is not None:
+                    # plain HTTP via a proxy: the request is for the absolute URL
+                    hdrs.update(conn.proxy_headers)
+                    conn.request('GET', u._replace(fragment='').geturl(), headers=hdrs)
+                else:
+                    conn.request('GET', path, headers=hdrs)
+                res = conn.getresponse()
+                break
+            except (http_client.HTTPException, socket.error):
+                # the server may have closed an idle connection: retry once over a new one
+                _drop_connection(u.scheme, u.netloc)
+                if attempt == 2:
+                    raise
+        if res.status in [301, 302, 303, 307, 308]:
+            res.read()
+            url = urljoin(url, res.getheader('Location'))
+            continue
+        if res.status >= 400:
+            res.read()
+            raise HTTPError(url, res.status, res.reason, res.msg, None)
+        return res
+    raise HTTPError(url, res.status, "too many redirects", res.msg, None)
+
+# Streams url into path in fixed-size chunks. If resume is True and path exists, only the
+# remainder is fetched (provided the server supports range requests).
+# progress, if given, is called as progress(url, bytes_so_far, total_bytes_or_None).
+def download(url, path, resume=False, progress=None):
+    from urllib.error import HTTPError
+    offset = os.path.getsize(path) if resume and os.path.isfile(path) else 0
+    try:
+        res = http_get(url, {'Range': 'bytes=%d-' % offset} if offset > 0 else {})
+    except HTTPError as e:
+        if e.code == 416 and offset > 0:
+            # range not satisfiable: nothing left to fetch
+            return os.path.abspath(path)
+        raise
+    try:
+        if offset > 0 and getattr(res, 'status', None) != 206:
+            offset = 0
+        length = res.headers.get('Content-Length')
+        total = offset + int(length) if length is not None else None
+        done = offset
+        with open(path, 'ab' if offset > 0 else 'wb') as file:
+            while True:
+                chunk = res.read(DOWNLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                file.write(chunk)
+                done += len(chunk)
+                if progress is not None:
+                    progress(url, done, total)
+    finally:
+        res.close()
+    if total is not None and done < total:
+        raise IOError("incomplete download of {}: got {} of {} bytes".format(url, done, total))
+    return os.path.abspath(path)
+
+#----------------------------------------------------------------------------------------------
+
+# Content is written into <dest>.part, which is renamed to dest once complete.
+# With resume=True, a <dest>.part left by an interrupted download is continued.
+
+def wget(url, dest="", tempdir=False, resume=False, progress=None):
+    import tempfile
     if dest == "":
         dest = os.path.basename(url)
         if dest == "":
@@ -54,11 +191,34 @@ def wget(url, dest="", tempdir=False):
         if tempdir:
             dir = tempfile.mkdtemp()
             dest = os.path.join(dir, dest)
-    ufile = urlopen(url)
-    data = ufile.read()
-    with open(dest, "wb") as file:
-        file.write(data)
-    return os.path.abspath(dest)
+    dest = os.path.abspath(dest)
+    part = dest + '.part'
+    try:
+        download(url, part, resume=resume, progress=progress)
+    except:
+        if not resume and os.path.exists(part):
+            os.remove(part)
+        raise
+    os.rename(part, dest)
+    return dest
+
+# Fetches urls concurrently, using up to jobs threads. Each item of urls is either a URL
+# or a (URL, dest) pair; dests (and URLs' file names) are relative to dir, if given.
+# Returns paths of the downloaded files, in the order of urls.
+
+def wget_many(urls, dir=None, jobs=4, resume=False, progress=None):
+    from concurrent.futures import ThreadPoolExecutor
+
+    def fetch(item):
+        url, dest = item if isinstance(item, tuple) else (item, "")
+        if dir is not None:
+            dest = os.path.join(dir, dest if dest != "" else os.path.basename(url))
+        return wget(url, dest=dest, resume=resume, progress=progress)
+
+    if dir is not None:
+        mkdir_p(dir)
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        return list(pool.map(fetch, urls))
 
 #----------------------------------------------------------------------------------------------
 
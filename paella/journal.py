@@ -0,0 +1,79 @@
+
+import functools
+import hashlib
+import json
+import os
+import sys
+import textwrap
+import threading
+import time
+from .cache import cache_dir
+from .files import fread, fwrite
+
+#----------------------------------------------------------------------------------------------
+
+# Step journal: records commands that completed successfully, so that if a run fails, a
+# subsequent run skips them. Once a run completes, its journal is removed.
+#
+# The journal is kept in cache_dir('journal') per script and platform. Steps are keyed by
+# command text, directory and sudo mode, so scripts should run steps in directories that
+# persist between runs (rather than in fresh temporary directories).
+# Commands run within methods decorated with @paella.no_journal, or with cache=False,
+# are never skipped.
+
+_local = threading.local()
+
+def no_journal(f):
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        prev = getattr(_local, 'disabled', False)
+        _local.disabled = True
+        try:
+            return f(*args, **kwargs)
+        finally:
+            _local.disabled = prev
+    return wrapper
+
+def journal_disabled():
+    return getattr(_local, 'disabled', False)
+
+#----------------------------------------------------------------------------------------------
+
+class Journal:
+    # force: ignore (and discard) steps recorded by previous runs
+    def __init__(self, triplet, force=False):
+        script = os.path.abspath(sys.argv[0])
+        name = "{}-{}-{}.json".format(os.path.basename(script),
+                                      hashlib.sha1(script.encode('utf-8')).hexdigest()[0:8], triplet)
+        self.path = os.path.join(cache_dir('journal'), name)
+        self.lock = threading.Lock()
+        self.steps = {}
+        if force:
+            self.remove()
+        else:
+            try:
+                self.steps = json.loads(fread(self.path))
+            except (OSError, IOError, ValueError):
+                pass
+
+    @staticmethod
+    def key(cmd, at=None, sudo=False):
+        text = textwrap.dedent(cmd).strip()
+        at = os.path.abspath(at if at is not None else os.getcwd())
+        return hashlib.sha256(json.dumps([text, at, str(sudo)]).encode('utf-8')).hexdigest()
+
+    def done(self, key):
+        with self.lock:
+            return key in self.steps
+
+    def add(self, key, cmd):
+        with self.lock:
+            self.steps[key] = {'cmd': textwrap.dedent(cmd).strip()[:200], 'time': time.time()}
+            fwrite(self.path + '.tmp', json.dumps(self.steps, indent=1))
+            os.rename(self.path + '.tmp', self.path)
+
+    def remove(self):
+        with self.lock:
+            self.steps = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
@@ -1,12 +1,7 @@
 
 import os
-import inspect
+import sys
 
 def caller_info(back_frames=1):
-    back_frames += 1
-    frame = inspect.currentframe()
-    while back_frames > 0:
-        frame = frame.f_back
-        back_frames -= 1
-    (filename, line_number, function_name, lines, index) = inspect.getframeinfo(frame)
-    return "%s:%d %s" % (filename, line_number, function_name)
+    frame = sys._getframe(back_frames + 1)
+    return "%s:%d %s" % (frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
@@ -1,10 +1,15 @@
 
 from __future__ import absolute_import
-import platform
+# the platform module is imported on first use (identification results are usually cached)
+import glob
+import hashlib
+import json
 import os
 import re
+import sys
 from .text import match, is_numeric
-from .files import fread
+from .files import fread, fwrite
+from .cache import cache_dir
 from .error import *
 
 #----------------------------------------------------------------------------------------------
@@ -210,11 +215,64 @@ class Platform:
 
     #------------------------------------------------------------------------------------------
 
-    def __init__(self, strict=False, brand=False):
+    # Identification results are memoized in-process and persisted in cache_dir('platform'),
+    # keyed by the state of the files and kernel attributes they are derived from.
+    # cache=False forces identification (and refreshes the cache).
+
+    STATE = ['os', 'dist', 'os_ver', 'os_full_ver', 'osnick', 'arch', 'darwin_ver']
+    SOURCES = ['/etc/os-release', '/etc/redhat-release', '/System/Library/CoreServices/SystemVersion.plist',
+               __file__]
+
+    _memo = {}
+
+    def __init__(self, strict=False, brand=False, cache=True):
         self.os = self.dist = self.os_ver = self.os_full_ver = self.osnick = self.arch = '?'
         self.strict = strict
         self.brand_mode = brand
 
+        key = self._cache_key()
+        state = Platform._memo.get(key)
+        if state is None and cache:
+            state = Platform._memo[key] = self._load_cache().get(key)
+        if state is not None and cache:
+            self.__dict__.update(state)
+            return
+        self._identify()
+        Platform._memo[key] = state = {k: v for k, v in self.__dict__.items() if k in Platform.STATE}
+        self._save_cache(key, state)
+
+    def _cache_key(self):
+        key = [self.strict, self.brand_mode] + (list(os.uname()) if hasattr(os, 'uname') else [sys.platform])
+        for path in Platform.SOURCES:
+            try:
+                st = os.stat(path)
+                key += [path, st.st_ino, st.st_size, st.st_mtime]
+            except OSError:
+                key += [path, None]
+        return hashlib.sha1(json.dumps(key).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _cache_file():
+        return os.path.join(cache_dir('platform'), 'platform.json')
+
+    def _load_cache(self):
+        try:
+            return json.loads(fread(Platform._cache_file()))
+        except (OSError, IOError, ValueError):
+            return {}
+
+    def _save_cache(self, key, state):
+        try:
+            cache = self._load_cache()
+            cache[key] = state
+            path = Platform._cache_file()
+            fwrite(path + '.%d' % os.getpid(), json.dumps(cache))
+            os.rename(path + '.%d' % os.getpid(), path)
+        except (OSError, IOError):
+            pass
+
+    def _identify(self):
+        import platform
         self.os = platform.system().lower()
         if self.os == 'linux':
             self._identify_linux()
@@ -227,7 +285,7 @@ class Platform:
         elif self.os == 'freebsd':
             self._identify_freebsd()
         else:
-            if strict:
+            if self.strict:
                 raise Error("Cannot determine OS")
             self.os_ver = ''
             self.dist = ''
@@ -310,6 +368,7 @@ class Platform:
     #------------------------------------------------------------------------------------------
 
     def _identify_macos(self):
+        import platform
         self.os = 'macos'
         self.dist = ''
         mac_ver = platform.mac_ver()
@@ -320,6 +379,7 @@ class Platform:
         # self.arch = mac_ver[2] # e.g. x64_64
 
     def _identify_windows(self):
+        import platform
         self.dist = self.os
         self.os_ver = platform.release()
         self.os_full_ver = os.version()
@@ -339,6 +399,7 @@ class Platform:
     #------------------------------------------------------------------------------------------
 
     def _identify_arch(self):
+        import platform
         self.arch = platform.machine().lower()
         if self.arch == 'amd64' or self.arch == 'x86_64':
             self.arch = 'x64'
@@ -401,6 +462,41 @@ class Platform:
 
     #------------------------------------------------------------------------------------------
 
+    def kernel_version(self):
+        import platform
+        return platform.release()
+
+    # e.g. "2.36" (empty if not glibc-based)
+    def glibc_version(self):
+        try:
+            libc = os.confstr('CS_GNU_LIBC_VERSION') # e.g. "glibc 2.36"
+        except (AttributeError, ValueError, OSError):
+            libc = None
+        if libc:
+            return libc.split()[-1]
+        import platform
+        lib, ver = platform.libc_ver()
+        return ver if lib == 'glibc' else ''
+
+    LIBSTDCXX_PATHS = ['/usr/lib64', '/lib64', '/usr/lib/*-linux-gnu', '/lib/*-linux-gnu', '/usr/lib',
+                       '/usr/local/lib64', '/usr/local/lib']
+
+    # highest GLIBCXX symbol version of the system libstdc++, e.g. "3.4.30" (empty if not found)
+    def libstdcxx_version(self):
+        libs = [lib for dir in Platform.LIBSTDCXX_PATHS for lib in glob.glob(os.path.join(dir, 'libstdc++.so.6'))]
+        if libs == []:
+            m = re.search(r'=>\s*(\S*libstdc\+\+\.so\S*)', sh("ldconfig -p", fail=False))
+            if m:
+                libs = [m.group(1)]
+        if libs == []:
+            return ''
+        vers = re.findall(br'GLIBCXX_(\d+\.\d+(?:\.\d+)?)\b', fread(os.path.realpath(libs[0]), mode='rb'))
+        if vers == []:
+            return ''
+        return max(vers, key=lambda v: tuple(map(int, v.split(b'.')))).decode()
+
+    #------------------------------------------------------------------------------------------
+
     def report(self):
         if self.dist != "":
             os = self.dist + " " + self.os
@@ -418,66 +514,81 @@ class OnPlatform:
     def __init__(self):
         self.stages = [0]
         self.platform = Platform()
+        self.hook = None
 
     def invoke(self):
         os = self.os = self.platform.os
         dist = self.dist = self.platform.dist
         self.ver = self.platform.os_ver
-        self.common_first()
+        self._hook('common_first')
 
         for stage in self.stages:
             self.stage = stage
-            self.common()
+            self._hook('common')
             if os == 'linux':
-                self.linux_first()
-                self.linux()
+                self._hook('linux_first')
+                self._hook('linux')
 
                 if self.platform.is_debian_compat():
-                    self.debian_compat()
+                    self._hook('debian_compat')
                 if self.platform.is_redhat_compat():
-                    self.redhat_compat()
+                    self._hook('redhat_compat')
                 if self.platform.is_arch_compat():
                     if getattr(self, "archlinux", None) is not None:
-                        self.archlinux()
+                        self._hook('archlinux')
 
                 if dist == 'fedora':
-                    self.fedora()
+                    self._hook('fedora')
                 elif dist == 'ubuntu':
-                    self.ubuntu()
+                    self._hook('ubuntu')
                 elif dist == 'debian':
-                    self.debian()
+                    self._hook('debian')
                 elif dist in ['centos', 'rocky', 'alma', 'redhat', 'rhel']:
-                    self.centos()
+                    self._hook('centos')
                 elif dist in ['redhat', 'rhel']:
-                    self.redhat()
+                    self._hook('redhat')
                 elif dist == 'ol':
-                    self.oracle()
+                    self._hook('oracle')
                 elif dist == 'suse':
-                    self.suse()
+                    self._hook('suse')
                 elif dist == 'arch':
-                    self.archlinux()
+                    self._hook('archlinux')
                 elif dist == 'linuxmint':
-                    self.linuxmint()
+                    self._hook('linuxmint')
                 elif dist == 'amzn':
-                    self.amzn()
+                    self._hook('amzn')
                 elif dist == 'alpine':
-                    self.alpine()
+                    self._hook('alpine')
                 elif dist == 'raspbian':
-                    self.raspbian()
+                    self._hook('raspbian')
                 elif dist == 'mariner':
-                    self.mariner()
+                    self._hook('mariner')
                 elif dist == 'azurelinux':
-                    self.azurelinux()
+                    self._hook('azurelinux')
                 else:
                     assert(False), "Cannot determine installer"
 
-                self.linux_last()
+                self._hook('linux_last')
             elif os == 'macos' or os == 'macos':
-                self.macos()
+                self._hook('macos')
             elif os == 'freebsd':
-                self.freebsd()
+                self._hook('freebsd')
 
-        self.common_last()
+        self._hook('common_last')
+
+    def _hook(self, name):
+        self.hook = name
+        self.before_hook(name)
+        getattr(self, name)()
+        self.after_hook(name)
+        self.hook = None
+
+    # called around each platform hook (e.g. common_first, linux, ubuntu, ...)
+    def before_hook(self, name):
+        pass
+
+    def after_hook(self, name):
+        pass
 
     def common(self):
         pass
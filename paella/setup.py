@@ -3,15 +3,35 @@ import os
 import sys
 import re
 import shutil
+import shlex
+import glob
 import subprocess
-import tempfile
 import textwrap
+import threading
+import time
+import itertools
+from collections import OrderedDict, deque
 from .platform import OnPlatform, Platform
 from .error import *
 import paella
+import paella.shell
+import paella.tasks
+import paella.trace
+import paella.journal
+import paella.bundle
 
 GIT_LFS_VER = '2.12.1'
 
+# pip install options that take a value
+PIP_VALUE_OPTIONS = ['-i', '--index-url', '--extra-index-url', '-f', '--find-links', '-c', '--constraint',
+                     '-r', '--requirement', '-e', '--editable', '-t', '--target', '--prefix', '--root',
+                     '--src', '--upgrade-strategy', '--no-binary', '--only-binary', '--platform',
+                     '--python-version', '--implementation', '--abi', '--trusted-host', '--cache-dir',
+                     '--progress-bar', '-C', '--config-settings', '--global-option', '--install-option']
+
+# pip install options that prevent batching of installations
+PIP_NO_DEFER_OPTIONS = ['-r', '--requirement', '-e', '--editable']
+
 #----------------------------------------------------------------------------------------------
 
 class OutputMode:
@@ -40,12 +60,62 @@ class OutputMode:
 
 #----------------------------------------------------------------------------------------------
 
+# Keeps the last size bytes of a command's output (and, if log is given, all of it in that file)
+
+class OutputTail:
+    def __init__(self, size, log=None):
+        self.size = size
+        self.chunks = deque()
+        self.length = 0
+        self.dropped = 0
+        self.log = log
+        self.log_file = open(log, 'wb') if log is not None else None
+
+    def write(self, data):
+        if not data:
+            return
+        if self.log_file is not None:
+            self.log_file.write(data)
+        self.chunks.append(data)
+        self.length += len(data)
+        while self.length - len(self.chunks[0]) >= self.size:
+            n = len(self.chunks.popleft())
+            self.length -= n
+            self.dropped += n
+
+    # returns (last size bytes of output, number of bytes omitted)
+    def tail(self):
+        data = b''.join(self.chunks)
+        extra = max(0, len(data) - self.size)
+        return data[extra:], self.dropped + extra
+
+    # the log file is retained only if keep is True
+    def close(self, keep=False):
+        if self.log_file is None:
+            return
+        self.log_file.close()
+        self.log_file = None
+        if not keep:
+            os.remove(self.log)
+
+#----------------------------------------------------------------------------------------------
+
 class Runner:
-    def __init__(self, nop=False, output="on_error"):
+    log_seq = itertools.count(1)
+
+    # persistent: run commands in long-lived login shells (see paella.shell) instead of
+    # starting a new shell for each command
+    # With output="on_error", the last error_tail KB of a failed command's output are printed
+    # (also READIES_ERROR_TAIL_KB), and if log_dir is given, the full output of failed commands
+    # is kept there (also READIES_LOG_DIR).
+    def __init__(self, nop=False, output="on_error", persistent=False, error_tail=None, log_dir=None):
         self.nop = nop
         self.is_root = os.geteuid() == 0
-        self.has_sudo = sh('command -v sudo', fail=False) != ''
+        self.has_sudo = shutil.which('sudo') is not None
         self.output = OutputMode(output)
+        self.persistent = persistent
+        self.error_tail = int(error_tail if error_tail is not None else ENV['READIES_ERROR_TAIL_KB', '64']) * 1024
+        self.log_dir = log_dir if log_dir is not None else ENV['READIES_LOG_DIR'] or None
 
     # sudo: True/False/"file"
     def run(self, cmd, at=None, output=None, nop=None, _try=False, sudo=False, echo=True):
@@ -70,7 +140,8 @@ class Runner:
                 cmds = [". {VENV}/bin/activate".format(VENV=venv)] + cmds
             cmd = "; ".join(cmds)
             cmd_for_log = cmd
-            if sudo is not False:
+            shell_cmd = cmd
+            if sudo is not False and not self.persistent:
                 cmd_file = paella.tempfilepath()
                 paella.fwrite(cmd_file, cmd)
                 cmd = "bash -l {}".format(cmd_file)
@@ -79,8 +150,9 @@ class Runner:
             if venv != '':
                 cmd = "{{ . {VENV}/bin/activate; {CMD}; }}".format(VENV=venv, CMD=cmd)
             cmd_for_log = cmd
+            shell_cmd = cmd
         if sudo is not False:
-            if sudo == "file":
+            if sudo == "file" and not self.persistent:
                 cmd_file = paella.tempfilepath()
                 paella.fwrite(cmd_file, cmd)
                 cmd = "sudo bash -l {}".format(cmd_file)
@@ -97,23 +169,54 @@ class Runner:
         if nop:
             return
         if output != True:
-            fd, temppath = tempfile.mkstemp()
-            os.close(fd)
-            cmd = "{{ {CMD}; }} >{LOG} 2>&1".format(CMD=cmd, LOG=temppath)
-        if at is None:
-            rc = subprocess.call(["bash", "-l", "-e", "-c", cmd])
+            log = None
+            if self.log_dir is not None:
+                paella.mkdir_p(self.log_dir)
+                log = os.path.join(self.log_dir, "{}-{}-{}.log".format(
+                    os.path.basename(sys.argv[0]), os.getpid(), next(self.log_seq)))
+            out = OutputTail(self.error_tail, log)
+        in_task = paella.tasks.current_task() is not None
+        t0 = time.time()
+        rusage = None
+        if self.persistent and not in_task:
+            # sudo commands are executed by "sudo bash -l -c" (i.e., without -e)
+            shell = paella.shell.shared_shell(login=True, sudo=sudo is not False)
+            if output != True:
+                rc, _, _ = shell.run(shell_cmd, at=at, errexit=sudo is False, capture="merge", sink=out.write)
+            else:
+                rc = shell.run(shell_cmd, at=at, errexit=sudo is False)
+        elif in_task or output != True:
+            proc = subprocess.Popen(["bash", "-l", "-e", "-c", cmd], cwd=at,
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            if output == True:
+                # output goes through sys.stdout, which collects task output
+                for line in proc.stdout:
+                    sys.stdout.write(line.decode('utf-8', errors='replace'))
+            else:
+                for data in iter(lambda: os.read(proc.stdout.fileno(), 65536), b''):
+                    out.write(data)
+            proc.stdout.close()
+            rc, rusage = paella.trace.wait(proc)
         else:
-            with cwd(at):
-                # rc = os.system(cmd)
-                rc = subprocess.call(["bash", "-l", "-e", "-c", cmd])
+            proc = subprocess.Popen(["bash", "-l", "-e", "-c", cmd], cwd=at)
+            rc, rusage = paella.trace.wait(proc)
+        tracer = paella.trace.tracer
+        if tracer is not None:
+            tracer.record('run', cmd_for_log, t0, time.time(), rc, rusage, at=at, sudo=sudo is not False)
         if rc > 0:
             if output != True:
                 if output.on_error():
-                    os.system("cat {}".format(temppath))
+                    data, omitted = out.tail()
+                    if omitted > 0:
+                        sys.stdout.write("# ... ({} bytes of output omitted)\n".format(omitted))
+                    sys.stdout.write(data.decode('utf-8', errors='replace'))
+                    sys.stdout.flush()
+                if out.log is not None:
+                    eprint("command output: " + out.log)
                 eprint("command failed: " + cmd_for_log)
                 sys.stderr.flush()
         if output != True:
-            os.remove(temppath)
+            out.close(keep=rc > 0)
         if cmd_file is not None:
             os.remove(cmd_file)
         if rc > 0 and not _try:
@@ -127,11 +230,24 @@ class Runner:
     def has_command(cmd):
         return os.system("command -v " + cmd + " > /dev/null") == 0
 
+    # makes persistent shells reload profile scripts
+    def profile_changed(self):
+        if self.persistent:
+            paella.shell.shared_shell(login=True, sudo=False).invalidate()
+            paella.shell.shared_shell(login=True, sudo=True).invalidate()
+
 #----------------------------------------------------------------------------------------------
 
 class PackageManager(object):
     def __init__(self, runner):
         self.runner = runner
+        self.installed = None
+        self.deferred = None
+        # package manager operations are serialized (tasks may run concurrently)
+        self.lock = threading.RLock()
+        self.metadata_ttl = int(ENV['READIES_REPO_TTL', '3600'])
+        self.refresh_pending = []
+        self.bundle = None
 
     @staticmethod
     def detect(platform, runner):
@@ -167,36 +283,240 @@ class PackageManager(object):
     def has_command(self, cmd):
         return self.runner.has_command(cmd)
 
-    def install(self, packs, group=False, output="on_error", _try=False):
-        return False
+    # Installation requests for packages that are already installed return immediately.
+    # Installed packages are queried once (see query_installed) and the snapshot is kept
+    # up to date with subsequent installs (uninstalls may also remove dependent packages, so
+    # the snapshot is dropped and queried again when needed).
+
+    def install(self, packs, group=False, output="on_error", _try=False, **kwargs):
+        with self.lock:
+            if self.refresh_pending:
+                self.refresh_repos(output=output)
+            if not group:
+                packs = " ".join(self.missing(packs))
+                if packs == "":
+                    return 0
+            if self.bundle is not None and self.bundle_type is not None and not group and not kwargs:
+                rc = self._install_bundled(packs, output=output, _try=_try)
+            else:
+                rc = self._install(packs, group=group, output=output, _try=_try, **kwargs)
+            self._update_installed(packs, group, rc, installed=True)
+            return rc
 
     def uninstall(self, packs, group=False, output="on_error", _try=False):
+        with self.lock:
+            rc = self._uninstall(packs, group=group, output=output, _try=_try)
+            self._update_installed(packs, group, rc, installed=False)
+            return rc
+
+    def _install(self, packs, group=False, output="on_error", _try=False):
+        return False
+
+    def _uninstall(self, packs, group=False, output="on_error", _try=False):
         return False
 
     def add_repo(self, repourl, repo="", output="on_error", _try=False):
         return False
 
-    def update(self, output="on_error"):
+    #------------------------------------------------------------------------------------------
+
+    # With a bundle (see paella.bundle), packages of each installation request are downloaded
+    # into the bundle before being installed (when recording), or installed from the
+    # bundle (when replaying). Managers that support this define bundle_type, _download and
+    # _install_files.
+
+    bundle_type = None
+
+    def _install_bundled(self, packs, output="on_error", _try=False):
+        if self.bundle.recording:
+            dir = self.bundle.new_packages_dir(self.bundle_type)
+            if not self._download(packs, dir, output=output, _try=True):
+                self.bundle.add_packages(self.bundle_type, packs, dir)
+            return self._install(packs, output=output, _try=_try)
+        files, missing = self.bundle.find_packages(self.bundle_type, packs)
+        rc = 0
+        if files != []:
+            rc = self._install_files(files, output=output, _try=_try)
+        if missing != []:
+            eprint("packages not found in bundle: " + " ".join(missing))
+            rc = self._install(" ".join(missing), output=output, _try=_try) or rc
+        return rc
+
+    def _download(self, packs, dir, output="on_error", _try=False):
         return False
 
+    def _install_files(self, files, output="on_error", _try=False):
+        return False
+
+    #------------------------------------------------------------------------------------------
+
+    # update() refreshes package metadata, unless it was refreshed within the last
+    # metadata_ttl seconds (READIES_REPO_TTL, default 3600; 0 means always refresh).
+    # Repos added by add_repo are recorded in refresh_pending, and refreshed at once
+    # before the next installation (see refresh_repos).
+
+    def update(self, output="on_error", force=False):
+        with self.lock:
+            if self.bundle is not None and self.bundle.replaying:
+                return 0
+            if not force and self.metadata_fresh():
+                print("# package metadata is up to date")
+                return 0
+            self.refresh_pending = []
+            return self._update(output=output)
+
+    def _update(self, output="on_error"):
+        return False
+
+    # returns time of last metadata refresh, or None if unknown
+    def metadata_time(self):
+        return None
+
+    def metadata_fresh(self):
+        t = self.metadata_time()
+        return t is not None and time.time() - t < self.metadata_ttl
+
+    def refresh_repos(self, output="on_error"):
+        with self.lock:
+            self.refresh_pending = []
+            return self._update(output=output)
+
+    #------------------------------------------------------------------------------------------
+
+    # returns a set of installed package names
+    def query_installed(self):
+        return set()
+
+    def installed_packages(self):
+        if self.installed is None:
+            try:
+                self.installed = self.query_installed()
+            except Exception:
+                self.installed = set()
+        return self.installed
+
+    def is_installed(self, pack):
+        return PackageManager.is_plain_name(pack) and pack in self.installed_packages()
+
+    # packages of packs (a space-separated string) that should be passed to the package manager.
+    # requests with package manager options are passed as they are, as options may apply to
+    # packages that are already installed (e.g., -t for upgrading from another release)
+    def missing(self, packs):
+        names = packs.split()
+        if any(pack.startswith('-') for pack in names):
+            return names
+        return [pack for pack in names if not self.is_installed(pack)]
+
+    # versions, paths, URLs, and options are never considered installed
+    @staticmethod
+    def is_plain_name(pack):
+        return re.match(r'^[A-Za-z0-9][A-Za-z0-9+._@:-]*$', pack) is not None
+
+    def _update_installed(self, packs, group, rc, installed):
+        if self.installed is None or rc is None:  # not queried yet, or nop
+            return
+        names = packs.split()
+        if rc or group or not installed or not all(PackageManager.is_plain_name(pack) for pack in names):
+            # hard to tell what happened (uninstalls also remove dependent packages):
+            # query again when needed
+            self.installed = None
+        else:
+            self.installed.update(names)
+
+    #------------------------------------------------------------------------------------------
+
+    # While deferring, install_deferred() only records packages (deduplicated, in order of
+    # arrival) and flush() installs all of them in a single transaction.
+    # If the batch fails, packages are installed one by one, each with its own _try and output.
+    # The batch itself is installed with the most verbose output mode requested (unless flush()
+    # is given an output mode).
+
+    def defer(self, on=True):
+        if on:
+            if self.deferred is None:
+                self.deferred = OrderedDict()
+        else:
+            self.flush()
+            self.deferred = None
+
+    def is_deferring(self):
+        return self.deferred is not None
+
+    def install_deferred(self, packs, output="on_error", _try=False):
+        with self.lock:
+            for pack in packs.split():
+                try0, output0 = self.deferred.get(pack, (True, None))
+                self.deferred[pack] = (try0 and _try, PackageManager._more_verbose(output0, output))
+        return 0
+
+    def flush(self, output=None):
+        with self.lock:
+            if not self.deferred:
+                return 0
+            packs = self.deferred
+            self.deferred = OrderedDict()
+            batch_output = output
+            if batch_output is None:
+                for _, pack_output in packs.values():
+                    batch_output = PackageManager._more_verbose(batch_output, pack_output)
+            rc = self.install(" ".join(packs.keys()), output=batch_output, _try=True)
+            if not rc:
+                return 0
+            eprint("batch installation failed, installing packages one by one")
+            rc = 0
+            for pack, (_try, pack_output) in packs.items():
+                rc = self.install(pack, output=output if output is not None else pack_output, _try=_try) or rc
+            return rc
+
+    @staticmethod
+    def _more_verbose(output1, output2):
+        if output1 is None:
+            return output2
+        rank = {"False": 0, "on_error": 1, "True": 2}
+        return max(output1, output2, key=lambda x: rank[OutputMode(x).mode])
+
+#----------------------------------------------------------------------------------------------
+
+def rpm_installed_packages():
+    packs = set()
+    for line in paella.sh_iter(r"rpm -qa --qf '%{NAME} %{ARCH}\n'"):
+        name_arch = line.split()
+        if len(name_arch) == 2:
+            packs.add(name_arch[0])
+            packs.add('.'.join(name_arch))
+    return packs
+
 #----------------------------------------------------------------------------------------------
 
 class Yum(PackageManager):
     def __init__(self, runner):
         super(Yum, self).__init__(runner)
 
-    def install(self, packs, group=False, output="on_error", _try=False):
+    def _install(self, packs, group=False, output="on_error", _try=False):
         if not group:
             return self.run("yum install -q -y " + packs, output=output, _try=_try, sudo=True)
         else:
             return self.run("yum groupinstall -y " + packs, output=output, _try=_try, sudo=True)
 
-    def uninstall(self, packs, group=False, output="on_error", _try=False):
+    def _uninstall(self, packs, group=False, output="on_error", _try=False):
         if not group:
             return self.run("yum remove -q -y " + packs, output=output, _try=_try, sudo=True)
         else:
             return self.run("yum group remove -y " + packs, output=output, _try=_try, sudo=True)
 
+    bundle_type = "rpm"
+
+    def _download(self, packs, dir, output="on_error", _try=False):
+        return self.run("yum install -q -y --downloadonly --downloaddir={DIR} {PACKS}".format(DIR=dir, PACKS=packs),
+                        output=output, _try=_try, sudo=True)
+
+    def _install_files(self, files, output="on_error", _try=False):
+        return self.run("yum install -q -y --disablerepo='*' {FILES}".format(FILES=" ".join(files)),
+                        output=output, _try=_try, sudo=True)
+
+    def query_installed(self):
+        return rpm_installed_packages()
+
     def add_repo(self, repourl, repo="", output="on_error", _try=False):
         if not self.has_command("yum-config-manager"):
             return self.install("yum-utils")
@@ -208,18 +528,31 @@ class Dnf(PackageManager):
     def __init__(self, runner):
         super(Dnf, self).__init__(runner)
 
-    def install(self, packs, group=False, output="on_error", _try=False):
+    def _install(self, packs, group=False, output="on_error", _try=False):
         if not group:
             return self.run("dnf install -q -y " + packs, output=output, _try=_try, sudo=True)
         else:
             return self.run("dnf groupinstall -y " + packs, output=output, _try=_try, sudo=True)
 
-    def uninstall(self, packs, group=False, output="on_error", _try=False):
+    def _uninstall(self, packs, group=False, output="on_error", _try=False):
         if not group:
             return self.run("dnf remove -q -y " + packs, output=output, _try=_try, sudo=True)
         else:
             return self.run("dnf group remove -y " + packs, output=output, _try=_try, sudo=True)
 
+    bundle_type = "rpm"
+
+    def _download(self, packs, dir, output="on_error", _try=False):
+        return self.run("dnf install -q -y --downloadonly --downloaddir={DIR} {PACKS}".format(DIR=dir, PACKS=packs),
+                        output=output, _try=_try, sudo=True)
+
+    def _install_files(self, files, output="on_error", _try=False):
+        return self.run("dnf install -q -y --disablerepo='*' {FILES}".format(FILES=" ".join(files)),
+                        output=output, _try=_try, sudo=True)
+
+    def query_installed(self):
+        return rpm_installed_packages()
+
     def add_repo(self, repourl, repo="", output="on_error", _try=False):
         if self.run("dnf config-manager 2>/dev/null", output=output, _try=True):
             return self.install("dnf-plugins-core", _try=_try)
@@ -231,18 +564,31 @@ class TDnf(PackageManager):
     def __init__(self, runner):
         super(TDnf, self).__init__(runner)
 
-    def install(self, packs, group=False, output="on_error", _try=False):
+    def _install(self, packs, group=False, output="on_error", _try=False):
         if not group:
             return self.run("tdnf install -q -y " + packs, output=output, _try=_try, sudo=True)
         else:
             return self.run("tdnf groupinstall -y " + packs, output=output, _try=_try, sudo=True)
 
-    def uninstall(self, packs, group=False, output="on_error", _try=False):
+    def _uninstall(self, packs, group=False, output="on_error", _try=False):
         if not group:
             return self.run("tdnf remove -q -y " + packs, output=output, _try=_try, sudo=True)
         else:
             return self.run("tdnf group remove -y " + packs, output=output, _try=_try, sudo=True)
 
+    bundle_type = "rpm"
+
+    def _download(self, packs, dir, output="on_error", _try=False):
+        return self.run("tdnf install -q -y --downloadonly --downloaddir={DIR} {PACKS}".format(DIR=dir, PACKS=packs),
+                        output=output, _try=_try, sudo=True)
+
+    def _install_files(self, files, output="on_error", _try=False):
+        return self.run("tdnf install -q -y --disablerepo='*' {FILES}".format(FILES=" ".join(files)),
+                        output=output, _try=_try, sudo=True)
+
+    def query_installed(self):
+        return rpm_installed_packages()
+
     def add_repo(self, repourl, repo="", output="on_error", _try=False):
         if self.run("tdnf config-manager 2>/dev/null", output=output, _try=True):
             return self.install("tdnf-plugins-core", _try=_try)
@@ -256,35 +602,106 @@ class Apt(PackageManager):
 
         # prevents apt-get from interactively prompting
         os.environ["DEBIAN_FRONTEND"] = 'noninteractive'
+        self.add_repo_no_update = None
 
-    def install(self, packs, group=False, output="on_error", _try=False):
+    def _install(self, packs, group=False, output="on_error", _try=False):
         return self.run("apt-get -qq install --fix-missing -y " + packs, output=output, _try=_try, sudo=True)
 
-    def uninstall(self, packs, group=False, output="on_error", _try=False):
+    def _uninstall(self, packs, group=False, output="on_error", _try=False):
         return self.run("apt-get -qq remove -y " + packs, output=output, _try=_try, sudo=True)
 
+    bundle_type = "deb"
+
+    def _download(self, packs, dir, output="on_error", _try=False):
+        return self.run("mkdir -p {DIR}/partial; apt-get -qq install --download-only -y -o Dir::Cache::archives={DIR} {PACKS}".
+                        format(DIR=dir, PACKS=packs), output=output, _try=_try, sudo=True)
+
+    def _install_files(self, files, output="on_error", _try=False):
+        return self.run("apt-get -qq install -y " + " ".join(files), output=output, _try=_try, sudo=True)
+
+    # Multi-arch packages are listed as name:arch; only those of the native arch (or of arch
+    # 'all') count as installed under their plain name.
+    def query_installed(self):
+        native = paella.sh("dpkg --print-architecture").strip()
+        packs = set()
+        for line in paella.sh_iter(r"dpkg-query -W -f='${Status}\t${binary:Package}\n'"):
+            status, _, pack = line.partition('\t')
+            if status.split()[-1:] != ['installed']:
+                continue
+            packs.add(pack)
+            name, _, arch = pack.partition(':')
+            if arch == '':
+                packs.add(name + ':' + native)
+            elif arch in [native, 'all']:
+                packs.add(name)
+        return packs
+
+    # add-apt-repository is told not to refresh metadata (if it supports that), and only the
+    # source lists it added or modified are refreshed, before the next installation
     def add_repo(self, repo_url, repo="", output="on_error", _try=False):
         if not self.has_command("add-apt-repository"):
             self.install("software-properties-common")
-        rc = self.run("add-apt-repository -y {URL}".format(URL=repo_url), output=output, _try=_try, sudo=True)
-        self.run("apt-get -qq update", output=output, _try=_try, sudo=True)
+        if self.add_repo_no_update is None:
+            self.add_repo_no_update = "--no-update" in paella.sh("add-apt-repository --help 2>&1", fail=False)
+        sources0 = self.sources()
+        rc = self.run("add-apt-repository -y {NOUP}{URL}".format(URL=repo_url, NOUP="-n " if self.add_repo_no_update else ""),
+                      output=output, _try=_try, sudo=True)
+        sources = self.sources()
+        changed = [file for file in sources if sources[file] != sources0.get(file)]
+        self.refresh_pending += changed if changed != [] else ['*']
         return rc
 
-    def update(self, output="on_error"):
+    def _update(self, output="on_error"):
         return self.run("apt-get -qq update -y", output=output, sudo=True)
 
+    SOURCES_LIST = '/etc/apt/sources.list'
+    SOURCES_PARTS = '/etc/apt/sources.list.d'
+    LISTS = '/var/lib/apt/lists'
+
+    # returns {source list file: mtime}
+    def sources(self):
+        files = [Apt.SOURCES_LIST] + [os.path.join(Apt.SOURCES_PARTS, f) for f in os.listdir(Apt.SOURCES_PARTS)] \
+            if os.path.isdir(Apt.SOURCES_PARTS) else [Apt.SOURCES_LIST]
+        return {f: os.stat(f).st_mtime for f in files if os.path.isfile(f)}
+
+    def metadata_time(self):
+        # lists may have been removed (e.g. in container images)
+        if glob.glob(os.path.join(Apt.LISTS, '*_Packages*')) == []:
+            return None
+        t = max(os.stat(path).st_mtime for path in [Apt.LISTS, os.path.join(Apt.LISTS, 'partial')]
+                if os.path.exists(path))
+        # sources modified after the last refresh are not reflected in metadata
+        if any(mtime > t for mtime in self.sources().values()):
+            return None
+        return t
+
+    def refresh_repos(self, output="on_error"):
+        with self.lock:
+            files = self.refresh_pending
+            self.refresh_pending = []
+            if '*' in files or Apt.SOURCES_LIST in files:
+                return self._update(output=output)
+            rc = 0
+            for file in files:
+                rc = self.run("apt-get -qq update -y -o Dir::Etc::sourcelist={FILE} -o Dir::Etc::sourceparts=- "
+                              "-o APT::Get::List-Cleanup=0".format(FILE=file), output=output, sudo=True) or rc
+            return rc
+
 #----------------------------------------------------------------------------------------------
 
 class Zypper(PackageManager):
     def __init__(self, runner):
         super(Zypper, self).__init__(runner)
 
-    def install(self, packs, group=False, output="on_error", _try=False):
+    def _install(self, packs, group=False, output="on_error", _try=False):
         return self.run("zypper --non-interactive install " + packs, output=output, _try=_try, sudo=True)
 
-    def uninstall(self, packs, group=False, output="on_error", _try=False):
+    def _uninstall(self, packs, group=False, output="on_error", _try=False):
         return self.run("zypper --non-interactive remove " + packs, output=output, _try=_try, sudo=True)
 
+    def query_installed(self):
+        return rpm_installed_packages()
+
     def add_repo(self, repo_url, repo="", output="on_error", _try=False):
         return self.run("zypprt addrepo {URL} {NAME}".format(URL=repo_url, NAME=repo), output=output, _try=_try, sudo=True)
 
@@ -294,7 +711,7 @@ class Pacman(PackageManager):
     def __init__(self, runner):
         super(Pacman, self).__init__(runner)
 
-    def install(self, packs, group=False, output="on_error", _try=False, aur=False):
+    def _install(self, packs, group=False, output="on_error", _try=False, aur=False):
         if aur is False:
             return self.run("pacman --noconfirm -S " + packs, output=output, _try=_try, sudo=True)
         else:
@@ -306,9 +723,12 @@ class Pacman(PackageManager):
                 raise FileNotFoundError("Failed to find yay or trizen, for aur package installation.")
             return self.run("{} --noconfirm -S {}".format(aurbin, packs), output=output, _try=_try, sudo=True)
 
-    def uninstall(self, packs, group=False, output="on_error", _try=False):
+    def _uninstall(self, packs, group=False, output="on_error", _try=False):
         return self.run("pacman --noconfirm -R " + packs, output=output, _try=_try, sudo=True)
 
+    def query_installed(self):
+        return set(paella.sh("pacman -Qq", lines=True)) - set([''])
+
     def add_repo(self, repourl, repo="", output="on_error", _try=False):
         return False
 
@@ -332,7 +752,7 @@ class Brew(PackageManager):
                 # required because osx pip installed are done with --user
                 os.environ["PATH"] = os.environ["PATH"] + ':' + os.environ["HOME"] + '/Library/Python/2.7/bin'
 
-    def install(self, packs, group=False, output="on_error", _try=False):
+    def _install(self, packs, group=False, output="on_error", _try=False):
         # brew will fail if package is already installed
         rc = True
         for pack in packs.split():
@@ -340,17 +760,20 @@ class Brew(PackageManager):
                      output=output, _try=_try, sudo=False) and rc
         return rc
 
-    def uninstall(self, packs, group=False, output="on_error", _try=False):
+    def _uninstall(self, packs, group=False, output="on_error", _try=False):
         rc = True
         for pack in packs.split():
             rc = self.run("brew remove {PACK}".format(PACK=pack), output=output, _try=_try,
                           sudo=False) and rc
         return rc
 
+    def query_installed(self):
+        return set(paella.sh("brew list -1 --formula 2>/dev/null || brew list -1", lines=True)) - set([''])
+
     def add_repo(self, repourl, repo="", output="on_error", _try=False):
         return False
 
-    def update(self, output="on_error"):
+    def _update(self, output="on_error"):
         if os.environ.get('BREW_UPDATE') != '1':
             return True
         return self.run("brew update || true", output=output)
@@ -361,12 +784,15 @@ class Pkg(PackageManager):
     def __init__(self, runner):
         super(Pkg, self).__init__(runner)
 
-    def install(self, packs, group=False, output="on_error", _try=False):
+    def _install(self, packs, group=False, output="on_error", _try=False):
         return self.run("pkg install -q -y " + packs, output=output, _try=_try, sudo=True)
 
-    def uninstall(self, packs, group=False, output="on_error", _try=False):
+    def _uninstall(self, packs, group=False, output="on_error", _try=False):
         return self.run("pkg delete -q -y " + packs, output=output, _try=_try, sudo=True)
 
+    def query_installed(self):
+        return set(paella.sh("pkg query %n", lines=True)) - set([''])
+
     def add_repo(self, repourl, repo="", output="on_error", _try=False):
         return False
 
@@ -376,25 +802,42 @@ class Alpine(PackageManager):
     def __init__(self, runner):
         super(Alpine, self).__init__(runner)
 
-    def install(self, packs, group=False, output="on_error", _try=False):
+    def _install(self, packs, group=False, output="on_error", _try=False):
         return self.run("apk add -q " + packs, output=output, _try=_try, sudo=True)
 
-    def uninstall(self, packs, group=False, output="on_error", _try=False):
+    def _uninstall(self, packs, group=False, output="on_error", _try=False):
         return self.run("apk del -q " + packs, output=output, _try=_try, sudo=True)
 
+    def query_installed(self):
+        return set(paella.sh("apk info -q", lines=True)) - set([''])
+
 #----------------------------------------------------------------------------------------------
 
 class Setup(OnPlatform):
-    def __init__(self, nop=False, verbose=False, sudo=True):
+    # batch: defer package installations and install them in batches (also READIES_BATCH_INSTALL=1)
+    # persistent: run commands in persistent shells (also READIES_PERSISTENT_SHELL=1)
+    # jobs: number of tasks (see paella.tasks) that may run concurrently (also READIES_JOBS)
+    # trace: True or trace file path: record executed commands (see paella.trace; also READIES_TRACE)
+    # journal: True: skip commands completed by a previous failed run; "force": start afresh
+    #   (see paella.journal; also READIES_JOURNAL=1|force)
+    # record/replay: bundle path: record fetched packages and files into a bundle, or install
+    #   from it (see paella.bundle; also READIES_BUNDLE_RECORD/READIES_BUNDLE_REPLAY)
+    # pip_batch: defer pip installations within platform hooks and install them together
+    #   (also READIES_PIP_BATCH=1)
+    # wheelhouse: True, or directory: build pip packages into a persistent wheelhouse and install
+    #   from it (also READIES_WHEELHOUSE=1|path; True means cache_dir('wheelhouse', <abi>-<triplet>))
+    def __init__(self, nop=False, verbose=False, sudo=True, batch=None, persistent=None, jobs=None,
+                 trace=None, journal=None, record=None, replay=None, pip_batch=None, wheelhouse=None):
         OnPlatform.__init__(self)
         self.verbose = verbose
         self.nop = nop
+        if persistent is None:
+            persistent = ENV['READIES_PERSISTENT_SHELL'] == '1'
         if verbose:
-            self.runner = Runner(nop=nop, output=True)
+            self.runner = Runner(nop=nop, output=True, persistent=persistent)
         else:
-            self.runner = Runner(nop=nop)
+            self.runner = Runner(nop=nop, persistent=persistent)
         self.stages = [0]
-        self.platform = Platform()
         self.os = self.platform.os
         self.arch = self.platform.arch
         self.osnick = self.platform.osnick
@@ -405,10 +848,56 @@ class Setup(OnPlatform):
         self.repo_refresh = True
 
         self.package_manager = PackageManager.detect(self.platform, self.runner)
+        if batch is None:
+            batch = ENV['READIES_BATCH_INSTALL'] == '1'
+        if batch:
+            self.package_manager.defer()
 
         self.python = sys.executable
         os.environ["PYTHONWARNINGS"] = 'ignore:DEPRECATION::pip._internal.cli.base_command'
 
+        if pip_batch is None:
+            pip_batch = ENV['READIES_PIP_BATCH'] == '1'
+        self.pip_batch = pip_batch
+        self.pip_deferred = OrderedDict()
+        self.pip_lock = threading.RLock()
+        if wheelhouse is None:
+            wheelhouse = ENV['READIES_WHEELHOUSE']
+            wheelhouse = True if wheelhouse == '1' else False if wheelhouse in ['', '0'] else wheelhouse
+        self.wheelhouse = wheelhouse if wheelhouse and not nop else False
+
+        if jobs is None:
+            jobs = int(ENV['READIES_JOBS', '4'])
+        self.tasks = paella.tasks.Tasks(self, jobs=jobs)
+
+        if trace is None:
+            trace = ENV['READIES_TRACE']
+            trace = True if trace == '1' else trace if trace != '' else False
+        self.tracer = None
+        if trace is not False:
+            self.tracer = paella.trace.start(trace if trace is not True else None)
+
+        if journal is None:
+            journal = ENV['READIES_JOURNAL']
+            journal = True if journal == '1' else journal if journal == 'force' else False
+        self.journal = None
+        if journal and not nop:
+            self.journal = paella.journal.Journal(self.platform.triplet(), force=journal == 'force')
+
+        if record is None and replay is None:
+            record = ENV['READIES_BUNDLE_RECORD'] or None
+            replay = ENV['READIES_BUNDLE_REPLAY'] or None
+        if record is not None and replay is not None:
+            raise Error("cannot both record and replay a bundle")
+        self.bundle = None
+        if (record or replay) is not None and not nop:
+            mode = 'record' if record is not None else 'replay'
+            self.bundle = paella.bundle.Bundle(record or replay, mode)
+            self.package_manager.bundle = self.bundle
+            # setup scripts invoked by this one use the same bundle
+            os.environ['READIES_BUNDLE_' + mode.upper()] = self.bundle.dir
+            os.environ['READIES_DOWNLOAD_CACHE'] = self.bundle.downloads_dir
+
         self.sudoIf(sudo)
 
     def setup(self):
@@ -423,14 +912,62 @@ class Setup(OnPlatform):
         print("# readies version: {}".format(gitver))
 
         self.invoke()
-
-    def run(self, cmd, at=None, output="on_error", nop=None, _try=False, sudo=False, echo=True):
-        return self.runner.run(cmd, at=at, output=output, nop=nop, _try=_try, sudo=sudo, echo=echo)
+        self.flush_install()
+        self.flush_pip()
+        if self.journal is not None:
+            self.journal.remove()
+        if self.bundle is not None:
+            self.bundle.close()
+        if self.tracer is not None:
+            self.tracer.summary()
+
+    # cache: if False, cmd is run even if a previous run has completed it (see paella.journal)
+    def run(self, cmd, at=None, output="on_error", nop=None, _try=False, sudo=False, echo=True, cache=True):
+        # commands may depend on packages requested so far, and on repos added so far
+        if self.package_manager.deferred:
+            self.flush_install()
+        if self.package_manager.refresh_pending:
+            self.package_manager.refresh_repos()
+        if self.pip_deferred:
+            self.flush_pip()
+        key = None
+        if self.journal is not None and cache and not paella.journal.journal_disabled():
+            key = self.journal.key(cmd, at=at, sudo=sudo)
+            if self.journal.done(key):
+                print("# done in previous run: {}".format(textwrap.dedent(cmd).strip().split("\n")[0]))
+                return 0
+        rc = self.runner.run(cmd, at=at, output=output, nop=nop, _try=_try, sudo=sudo, echo=echo)
+        if key is not None and rc == 0:
+            self.journal.add(key, cmd)
+        return rc
 
     @staticmethod
     def has_command(cmd):
         return Runner.has_command(cmd)
 
+    #------------------------------------------------------------------------------------------
+
+    def add_task(self, name, func, after=None):
+        self.tasks.add(name, func, after=after)
+
+    def before_hook(self, name):
+        if name == 'common_first':
+            self.tasks.start()
+        elif name == 'common_last':
+            self.tasks.finish()
+        if self.tracer is not None:
+            self.tracer.set_hook(getattr(self, 'stage', None), name)
+            self.hook_t0 = time.time()
+
+    def after_hook(self, name):
+        self.flush_pip()
+        self.tasks.hook_done(name)
+        if self.tracer is not None:
+            self.tracer.record('hook', name, self.hook_t0, time.time())
+            self.tracer.set_hook(None, None)
+
+    #------------------------------------------------------------------------------------------
+
     @property
     def profile_d(self):
         if self.os == 'macos':
@@ -448,6 +985,7 @@ class Setup(OnPlatform):
         if not os.path.isdir(d):
             self.run('mkdir -p "{}"'.format(d), sudo=not_mac)
         self.run('cp "{FROM}" "{TO}"'.format(FROM=file, TO=os.path.join(d, as_file)), sudo=not_mac)
+        self.runner.profile_changed()
 
     def cat_to_profile_d(self, text, as_file=None):
         file = paella.tempfilepath()
@@ -460,24 +998,47 @@ class Setup(OnPlatform):
             self.run('mkdir -p "{}"'.format(d), sudo=not_mac)
         self.run('cp "{FROM}" "{TO}"'.format(FROM=file, TO=os.path.join(d, as_file)), sudo=not_mac)
         os.unlink(file)
+        self.runner.profile_changed()
 
     def sudoIf(self, sudo=True):
         if sudo:
-            self.run("true", sudo=True, echo=False)
+            # a probe (acquiring sudo credentials up front), so never skipped by the journal
+            self.run("true", sudo=True, echo=False, cache=False)
 
     #------------------------------------------------------------------------------------------
 
-    def install(self, packs, group=False, output="on_error", _try=False, **kwargs):
-        return self.package_manager.install(packs, group=group, output=output, _try=_try, **kwargs)
+    # in batch mode, installations are deferred until the next command is run (or defer=False
+    # is given). Group installations, installations with package manager options, and those with
+    # extra arguments are never deferred.
+    def install(self, packs, group=False, output="on_error", _try=False, defer=None, **kwargs):
+        pm = self.package_manager
+        if defer is None:
+            defer = pm.is_deferring()
+        if defer and pm.is_deferring() and not group and not kwargs \
+           and all(not pack.startswith('-') for pack in packs.split()):
+            return pm.install_deferred(packs, output=output, _try=_try)
+        self.flush_install()
+        return pm.install(packs, group=group, output=output, _try=_try, **kwargs)
+
+    # installs deferred packages (see install); code that relies on requested packages being
+    # present (other than commands run by run()) should call this first
+    def flush_install(self, output=None):
+        return self.package_manager.flush(output=output)
 
     def uninstall(self, packs, group=False, output="on_error", _try=False):
+        self.flush_install()
         return self.package_manager.uninstall(packs, group=group, output=output, _try=_try)
 
     def group_install(self, packs, output="on_error", _try=False):
         return self.install(packs, group=True, output=output, _try=_try)
 
     def add_repo(self, repo_url, repo="", _try=False):
-        return self.package_manager.add_repo(repo_url, repo=repo, _try=_try)
+        if self.bundle is not None and self.bundle.replaying:
+            # packages are installed from the bundle
+            return 0
+        self.flush_install()
+        with self.package_manager.lock:
+            return self.package_manager.add_repo(repo_url, repo=repo, _try=_try)
 
     #------------------------------------------------------------------------------------------
 
@@ -485,15 +1046,117 @@ class Setup(OnPlatform):
         return self.run(self.python + " -m pip --disable-pip-version-check " + cmd,
                         output=output, _try=_try, sudo=False)
 
-    def pip_install(self, cmd, output="on_error", _try=False):
+    # With pip_batch, pip installations within platform hooks are deferred (unless defer=False
+    # is given) until the hook completes or the next command is run. Deferred installations
+    # return 0; their failures surface when they are flushed (see flush_pip). Deferred
+    # requirements with the same pip options are installed by a single pip invocation (so they
+    # are resolved together); if that fails, they are installed one by one, each with its own _try.
+    # Installations with -e or -r, and those within tasks, are never deferred.
+    def pip_install(self, cmd, output="on_error", _try=False, defer=None):
+        if defer is None:
+            defer = self.pip_batch and self.hook is not None and paella.tasks.current_task() is None
+        if defer:
+            opts, reqs = Setup.pip_split_args(cmd)
+            if reqs != [] and not any(opt.split('=')[0] in PIP_NO_DEFER_OPTIONS for opt in opts):
+                with self.pip_lock:
+                    self.pip_deferred.setdefault((" ".join(opts), output), []).append((cmd, reqs, _try))
+                return 0
+        return self._pip_install(cmd, output=output, _try=_try)
+
+    def flush_pip(self):
+        with self.pip_lock:
+            if not self.pip_deferred:
+                return 0
+            batches = self.pip_deferred
+            self.pip_deferred = OrderedDict()
+            rc = 0
+            for (opts, output), reqs in batches.items():
+                if len(reqs) == 1:
+                    cmd, _, _try = reqs[0]
+                    rc = self._pip_install(cmd, output=output, _try=_try) or rc
+                    continue
+                names = list(OrderedDict.fromkeys(req for _, r, _ in reqs for req in r))
+                cmd = " ".join([opts] + [shlex.quote(req) for req in names]).strip()
+                if self._pip_install(cmd, output=output, _try=True) == 0:
+                    continue
+                eprint("batch pip installation failed, installing requirements one by one")
+                for cmd, _, _try in reqs:
+                    rc = self._pip_install(cmd, output=output, _try=_try) or rc
+            return rc
+
+    def _pip_install(self, cmd, output="on_error", _try=False):
         pip_user = ''
         # if self.os == 'macos' and 'VIRTUAL_ENV' not in os.environ:
         if 'VIRTUAL_ENV' not in os.environ:
             pip_user = '--user '
+        if self.bundle is not None:
+            wheels = self.bundle.wheels_dir
+            if self.bundle.recording:
+                self.run("{PYTHON} -m pip download --disable-pip-version-check -d {DIR} {CMD}".
+                         format(PYTHON=self.python, DIR=wheels, CMD=Setup.pip_download_args(cmd)),
+                         output=output, _try=True, sudo=False)
+                cmd = "--find-links {DIR} {CMD}".format(DIR=wheels, CMD=cmd)
+            else:
+                cmd = "--no-index --find-links {DIR} {CMD}".format(DIR=wheels, CMD=cmd)
+        elif self.wheelhouse is not False and Setup.pip_wheelable(cmd):
+            wheels = self.wheelhouse_dir()
+            if wheels is not None:
+                # wheels already in the wheelhouse are reused rather than built again
+                with paella.file_lock(os.path.join(wheels, '.lock')):
+                    rc = self.run("{PYTHON} -m pip wheel --disable-pip-version-check -w {DIR} --find-links {DIR} {CMD}".
+                                  format(PYTHON=self.python, DIR=wheels, CMD=Setup.pip_download_args(cmd)),
+                                  output=output, _try=True, sudo=False)
+                if rc == 0:
+                    cmd = "--no-index --find-links {DIR} {CMD}".format(DIR=wheels, CMD=cmd)
         return self.run("{PYTHON} -m pip install --disable-pip-version-check {PIP_USER} {CMD}".
                         format(PYTHON=self.python, PIP_USER=pip_user, CMD=cmd),
                         output=output, _try=_try, sudo=False)
 
+    # wheels depend on the interpreter ABI and on the platform, so each pair has its own wheelhouse
+    def wheelhouse_dir(self):
+        if self.wheelhouse is not True:
+            return self.wheelhouse
+        python = getattr(self, '_wheelhouse_python', None)
+        if python != self.python:
+            try:
+                abi = paella.sh("{} -c 'import sys; print(sys.implementation.cache_tag + sys.abiflags)'".
+                                format(self.python))
+                self._wheelhouse = paella.cache_dir('wheelhouse', "{}-{}".format(abi, self.platform.triplet()))
+            except Exception:
+                self._wheelhouse = None
+            self._wheelhouse_python = self.python
+        return self._wheelhouse
+
+    # pip install arguments, without options that pip download and pip wheel do not accept
+    @staticmethod
+    def pip_download_args(cmd):
+        install_only = ['--user', '-U', '--upgrade', '--force-reinstall', '-I', '--ignore-installed',
+                        '--no-warn-script-location', '--no-warn-conflicts']
+        return " ".join(shlex.quote(arg) for arg in shlex.split(cmd) if arg not in install_only)
+
+    # splits pip install arguments into options (with their values) and requirements
+    @staticmethod
+    def pip_split_args(cmd):
+        opts = []
+        reqs = []
+        args = iter(shlex.split(cmd))
+        for arg in args:
+            if not arg.startswith('-'):
+                reqs.append(arg)
+                continue
+            opts.append(shlex.quote(arg))
+            if arg in PIP_VALUE_OPTIONS:
+                opts.append(shlex.quote(next(args, '')))
+        return opts, reqs
+
+    # whether all requirements are named (rather than VCS URLs, paths, or requirement files)
+    @staticmethod
+    def pip_wheelable(cmd):
+        opts, reqs = Setup.pip_split_args(cmd)
+        if reqs == [] or any(opt.split('=')[0] in PIP_NO_DEFER_OPTIONS for opt in opts):
+            return False
+        return all(re.match(r'^[A-Za-z0-9][A-Za-z0-9._-]*(\[[^\]]*\])?\s*([<>=!~;].*)?$', req) for req in reqs)
+
     def pip_uninstall(self, cmd, output="on_error", _try=False):
         return self.run("{PYTHON} -m pip uninstall --disable-pip-version-check -y {CMD} || true".
                         format(PYTHON=self.python, CMD=cmd),
@@ -501,6 +1164,23 @@ class Setup(OnPlatform):
 
     #------------------------------------------------------------------------------------------
 
+    # Fetches url via the download cache (see paella.cache) and returns the path of the cached
+    # file, or of dest (into which the file is linked or copied).
+    def download(self, url, sha256=None, dest=None):
+        print("# download {}".format(url))
+        sys.stdout.flush()
+        if self.nop:
+            return dest if dest is not None else paella.DownloadCache().path(url)
+        # the download may depend on requested packages (e.g. ca-certificates)
+        self.flush_install()
+        t0 = time.time()
+        path = paella.cached_download(url, sha256=sha256, dest=dest)
+        if self.tracer is not None:
+            self.tracer.record('download', url, t0, time.time())
+        return path
+
+    #------------------------------------------------------------------------------------------
+
     def install_downloaders(self, _try=False):
         if self.os == 'linux':
             self.install("ca-certificates", _try=_try)
@@ -518,15 +1198,16 @@ class Setup(OnPlatform):
             lfs_arch = 'arm'
         else:
             raise Error("Cannot determine platform for git-lfs installation")
+        tgz = self.download("https://github.com/git-lfs/git-lfs/releases/download/v{LFS_VER}/git-lfs-linux-{ARCH}-v{LFS_VER}.tar.gz".
+                            format(LFS_VER=GIT_LFS_VER, ARCH=lfs_arch))
         self.run("""
             set -e
             d=$(mktemp -d /tmp/git-lfs.XXXXXX)
             mkdir -p $d
-            wget -q https://github.com/git-lfs/git-lfs/releases/download/v{LFS_VER}/git-lfs-linux-{ARCH}-v{LFS_VER}.tar.gz -O $d/git-lfs.tar.gz
-            (cd $d; tar xf git-lfs.tar.gz)
+            (cd $d; tar xf {TGZ})
             $d/install.sh
             rm -rf $d
-            """.format(LFS_VER=GIT_LFS_VER, ARCH=lfs_arch), sudo=True)
+            """.format(TGZ=tgz), sudo=True)
 
     def install_gnu_utils(self, _try=False):
         packs = ""
@@ -539,11 +1220,14 @@ class Setup(OnPlatform):
         elif self.os == 'freebsd':
             packs = "gmake coreutils findutils gsed gtar gawk"
         self.install(packs)
+        self.flush_install()
 
         for x in ['make', 'find', 'xargs', 'sed', 'tar', 'mktemp', 'du']:
             dest = os.path.join(path, x)
             if not os.path.exists(dest):
-                src = paella.sh("command -v g{}".format(x)).strip()
+                src = shutil.which("g" + x)
+                if src is None:
+                    raise Error("cannot find g{}".format(x))
                 if os.path.exists(dest):
                     os.unlink(dest)
                 os.symlink(src, dest)
@@ -561,11 +1245,8 @@ class Setup(OnPlatform):
             return
         if self.arch != 'x64':
             raise Error("Cannot install gnu tar on non-x64 platform")
-        self.run("""
-            dir=$(mktemp -d /tmp/tar.XXXXXX)
-            (cd $dir; wget --no-verbose -O tar.tgz http://redismodules.s3.amazonaws.com/readies/gnu/gnu-tar-1.32-x64-centos7.tgz; tar -xzf tar.tgz -C /; )
-            rm -rf $dir
-            """, sudo=True)
+        tgz = self.download("http://redismodules.s3.amazonaws.com/readies/gnu/gnu-tar-1.32-x64-centos7.tgz")
+        self.run("tar -xzf {} -C /".format(tgz), sudo=True)
 
     def setup_dotlocal(self):
         self.cat_to_profile_d(r'''
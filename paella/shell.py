@@ -0,0 +1,181 @@
+
+import atexit
+import errno
+import fcntl
+import os
+import select
+import shutil
+import subprocess
+import tempfile
+import threading
+
+#----------------------------------------------------------------------------------------------
+
+# A long-lived bash process that executes commands one at a time.
+# Commands are sent over a FIFO and each of them runs in a subshell, so commands cannot
+# affect each other (i.e. cd, set, and variable assignments are not retained), and the
+# subshell's exit code is reported over another FIFO.
+# Commands inherit the shell's stdin/stdout/stderr, unless output is captured (in which case
+# it is passed via FIFOs as well).
+#
+# Since the shell is started once, it is restarted whenever the environment of this process
+# changes or (for login shells) whenever profile scripts change, so commands always see
+# what a freshly started shell would see.
+
+SHELL_LOOP = r'''
+exec 3<"{DIR}/cmd" 4>"{DIR}/rc"
+while IFS= read -r -d '' __paella_e <&3 && IFS= read -r -d '' __paella_d <&3 \
+        && IFS= read -r -d '' __paella_o <&3 && IFS= read -r -d '' __paella_c <&3; do
+    (
+        exec 3<&- 4>&-
+        cd "$__paella_d" || exit 1
+        case "$__paella_o" in
+            merge) exec >"{DIR}/out" 2>&1 ;;
+            split) exec >"{DIR}/out" 2>"{DIR}/err" ;;
+        esac
+        [[ $__paella_e != 1 ]] || set -e
+        eval "$__paella_c"
+    )
+    echo $? >&4
+done
+'''
+
+PROFILE_FILES = ['/etc/profile', '/etc/profile.d', '~/.bash_profile', '~/.bash_login', '~/.profile',
+                 '~/.profile.d']
+
+class Shell:
+    def __init__(self, login=True, sudo=False):
+        self.login = login
+        self.sudo = sudo
+        self.proc = None
+        self.lock = threading.RLock()
+
+    def __del__(self):
+        self.close()
+
+    def _profile_state(self):
+        if not self.login:
+            return None
+        state = []
+        for path in PROFILE_FILES:
+            try:
+                state.append(os.stat(os.path.expanduser(path)).st_mtime)
+            except OSError:
+                state.append(None)
+        return state
+
+    def _start(self):
+        self.dir = tempfile.mkdtemp(prefix='paella-sh.')
+        fds = {}
+        for name in ['cmd', 'rc', 'out', 'err']:
+            path = os.path.join(self.dir, name)
+            os.mkfifo(path, 0o600)
+            # opening for both reading and writing never blocks, and keeps the FIFO open
+            # regardless of what the shell does
+            fds[name] = os.open(path, os.O_RDWR)
+        for name in ['rc', 'out', 'err']:
+            fl = fcntl.fcntl(fds[name], fcntl.F_GETFL)
+            fcntl.fcntl(fds[name], fcntl.F_SETFL, fl | os.O_NONBLOCK)
+        self.fds = fds
+        self.env = dict(os.environ)
+        self.profile = self._profile_state()
+        self.profile_changed = False
+        args = ['bash'] + (['-l'] if self.login else []) + ['-c', SHELL_LOOP.replace('{DIR}', self.dir)]
+        if self.sudo:
+            args = ['sudo'] + args
+        self.proc = subprocess.Popen(args)
+
+    def close(self):
+        if self.proc is None:
+            return
+        proc = self.proc
+        self.proc = None
+        for fd in self.fds.values():
+            os.close(fd)
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    # forces reloading of profile scripts before the next command
+    def invalidate(self):
+        self.profile_changed = True
+
+    def _stale(self):
+        return self.proc.poll() is not None or self.profile_changed or \
+            self.env != os.environ or self.profile != self._profile_state()
+
+    # capture: None (inherit), "merge" (stderr into stdout), or "split"
+    # returns rc if capture is None, otherwise (rc, out, err) with output as bytes
+    # sink: if given, captured output is passed to it as it arrives (rather than returned)
+    def run(self, cmd, at=None, errexit=True, capture=None, sink=None):
+        with self.lock:
+            if self.proc is not None and self._stale():
+                self.close()
+            if self.proc is None:
+                self._start()
+            fields = ['1' if errexit else '0', os.path.abspath(at) if at is not None else os.getcwd(),
+                      capture or '', cmd]
+            data = ('\0'.join(fields) + '\0').encode('utf-8')
+            while data:
+                data = data[os.write(self.fds['cmd'], data):]
+            rc, out, err = self._wait(sink)
+        if capture is None:
+            return rc
+        return rc, out, err
+
+    def _read(self, fd):
+        chunks = []
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError as e:
+                if e.errno in [errno.EAGAIN, errno.EWOULDBLOCK]:
+                    break
+                raise
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+    def _wait(self, sink=None):
+        fds = self.fds
+        rc = b''
+        out = []
+        err = []
+        put_out = sink if sink is not None else out.append
+        put_err = sink if sink is not None else err.append
+        while not rc.endswith(b'\n'):
+            ready, _, _ = select.select([fds['rc'], fds['out'], fds['err']], [], [], 1)
+            if fds['out'] in ready:
+                put_out(self._read(fds['out']))
+            if fds['err'] in ready:
+                put_err(self._read(fds['err']))
+            if fds['rc'] in ready:
+                rc += self._read(fds['rc'])
+            elif not ready and self.proc.poll() is not None:
+                rc = b'255\n'
+        # the subshell has exited, so whatever it wrote is already in the FIFOs
+        put_out(self._read(fds['out']))
+        put_err(self._read(fds['err']))
+        return int(rc), b''.join(out), b''.join(err)
+
+#----------------------------------------------------------------------------------------------
+
+_shells = {}
+_shells_lock = threading.Lock()
+
+def shared_shell(login=True, sudo=False):
+    with _shells_lock:
+        key = (login, sudo)
+        shell = _shells.get(key)
+        if shell is None:
+            shell = _shells[key] = Shell(login=login, sudo=sudo)
+        return shell
+
+@atexit.register
+def _close_shared_shells():
+    for shell in _shells.values():
+        shell.close()
@@ -0,0 +1,170 @@
+
+import hashlib
+import json
+import os
+import re
+import time
+from .cache import cache_dir
+from .files import fread, fwrite, http_get
+from .utils import sh
+from .error import *
+
+#----------------------------------------------------------------------------------------------
+
+TAGS_PER_PAGE = 100
+
+# attempts to fetch a page when GitHub drops the connection, and the pause between them
+DISCONNECT_RETRIES = 10
+DISCONNECT_PAUSE = 6
+
+# Tags of a GitHub repository, via the REST API.
+# The first page of tags tells the number of pages (Link header), which are then fetched
+# concurrently (each thread reusing its connection; see paella.files.http_get).
+# Tag lists are cached in cache_dir('tags') for ttl seconds (READIES_TAGS_TTL, default 600),
+# after which each cached page is revalidated with its ETag. GitHub lists tags by name rather
+# than by date, so a new tag may land on any page; unchanged pages cost a 304 response each.
+# Cached lists older than max_age seconds (READIES_TAGS_MAX_AGE, default 86400) are fetched
+# afresh.
+# The API URL can be set with READIES_GITHUB_API (e.g. for a mirror).
+
+class GithubTags:
+    def __init__(self, org, repo, token=None, ttl=None, jobs=8, api=None, max_age=None):
+        self.org = org
+        self.repo = repo
+        self.token = token
+        self.ttl = int(ttl if ttl is not None else ENV['READIES_TAGS_TTL', '600'])
+        self.max_age = int(max_age if max_age is not None else ENV['READIES_TAGS_MAX_AGE', '86400'])
+        self.jobs = jobs
+        self.api = (api or ENV['READIES_GITHUB_API', 'https://api.github.com']).rstrip('/')
+        api_key = hashlib.sha256(self.api.encode('utf-8')).hexdigest()[0:12]
+        self.cache_file = os.path.join(cache_dir('tags'), "github-{}-{}-{}.json".format(org, repo, api_key))
+
+    def url(self, page=1):
+        return "{API}/repos/{ORG}/{REPO}/tags?per_page={N}&page={PAGE}".format(
+            API=self.api, ORG=self.org, REPO=self.repo, N=TAGS_PER_PAGE, PAGE=page)
+
+    # returns tag names, in the order listed by GitHub
+    def names(self, refresh=False):
+        now = time.time()
+        cached = self._load() if not refresh else None
+        if cached is not None and now - cached['fetched'] >= self.max_age:
+            cached = None
+        if cached is not None and now - cached['time'] < self.ttl:
+            return [tag for page in cached['pages'] for tag in page]
+        old_pages = cached['pages'] if cached is not None else []
+        old_etags = cached['etags'] if cached is not None else []
+
+        def etag_of(page):
+            return old_etags[page - 1] if page <= len(old_etags) else None
+
+        tags, etag, last = self._page(1, etag_of(1))
+        pages = [tags if tags is not None else old_pages[0]]
+        etags = [etag or etag_of(1)]
+        # a 304 response may lack the Link header: the number of pages is then assumed unchanged
+        assumed = last is None and tags is None
+        if last is None:
+            last = len(old_pages) if tags is None else 1
+        if last > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            with ThreadPoolExecutor(max_workers=max(1, min(self.jobs, last - 1))) as pool:
+                for page, (tags, etag, _) in enumerate(pool.map(lambda page: self._page(page, etag_of(page)),
+                                                                range(2, last + 1)), 2):
+                    pages.append(tags if tags is not None else old_pages[page - 1])
+                    etags.append(etag or etag_of(page))
+        # if the number of pages was assumed, new tags may have spilled over to further pages
+        while assumed and len(pages[-1]) == TAGS_PER_PAGE:
+            tags, etag, _ = self._page(len(pages) + 1, None)
+            if not tags:
+                break
+            pages.append(tags)
+            etags.append(etag)
+        fetched = cached['fetched'] if cached is not None else now
+        self._save({'time': now, 'fetched': fetched, 'etags': etags, 'pages': pages})
+        return [tag for page in pages for tag in page]
+
+    # returns (tag names, or None if not modified since etag, ETag, number of the last page or None)
+    def _page(self, page, etag=None):
+        headers = {'Accept': 'application/vnd.github+json'}
+        if self.token:
+            headers['Authorization'] = 'Bearer ' + self.token
+        if etag:
+            headers['If-None-Match'] = etag
+        res = self._get(self.url(page), headers)
+        try:
+            body = res.read()
+            status = getattr(res, 'status', 200)
+            etag = res.headers.get('ETag')
+            link = res.headers.get('Link') or ''
+        finally:
+            res.close()
+        m = re.search(r'<[^>]*[?&]page=(\d+)[^>]*>;\s*rel="last"', link)
+        last = int(m.group(1)) if m else None
+        if status == 304:
+            return None, etag, last
+        return GithubTags._tag_names(body), etag, last
+
+    # GitHub occasionally drops connections under load: such requests are retried
+    def _get(self, url, headers):
+        from http.client import RemoteDisconnected
+        for attempt in range(1, DISCONNECT_RETRIES + 1):
+            try:
+                return http_get(url, headers=headers)
+            except RemoteDisconnected:
+                if attempt == DISCONNECT_RETRIES:
+                    raise Error("cannot read tags from {}: remote end closed connection".format(url))
+                time.sleep(DISCONNECT_PAUSE)
+
+    @staticmethod
+    def _tag_names(body):
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        return [tag['name'] for tag in json.loads(body)]
+
+    #------------------------------------------------------------------------------------------
+
+    def _load(self):
+        try:
+            cached = json.loads(fread(self.cache_file))
+        except (OSError, IOError, ValueError):
+            return None
+        return cached if 'pages' in cached else None
+
+    def _save(self, cached):
+        tmp = "{}.{}".format(self.cache_file, os.getpid())
+        fwrite(tmp, json.dumps(cached))
+        os.rename(tmp, self.cache_file)
+
+#----------------------------------------------------------------------------------------------
+
+# Tags of a git repository (any git URL, including a local mirror), via a single
+# 'git ls-remote' round trip, which is not subject to GitHub API rate limits.
+# Tags are listed in refname order.
+
+class GitRemoteTags:
+    def __init__(self, url):
+        self.url = url
+
+    def names(self, refresh=False):
+        tags = []
+        for line in sh(['git', 'ls-remote', '--tags', '--refs', self.url], lines=True):
+            ref = line.split('\t')[-1]
+            if ref.startswith('refs/tags/'):
+                tags.append(ref[len('refs/tags/'):])
+        return tags
+
+#----------------------------------------------------------------------------------------------
+
+# Returns a tag source (with a names() method) for source, which is either:
+#   github:ORG/REPO, or ORG/REPO    GitHub REST API (token: GitHub token, or None)
+#   git:URL, or a git URL or path   git ls-remote
+
+def tag_source(source, token=None):
+    if source.startswith('github:'):
+        org, repo = source[len('github:'):].split('/', 1)
+        return GithubTags(org, repo, token=token)
+    if source.startswith('git:'):
+        return GitRemoteTags(source[len('git:'):])
+    if re.match(r'^[\w.-]+/[\w.-]+$', source) and not os.path.exists(source):
+        org, repo = source.split('/')
+        return GithubTags(org, repo, token=token)
+    return GitRemoteTags(source)
@@ -0,0 +1,182 @@
+
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from .error import *
+
+#----------------------------------------------------------------------------------------------
+
+# Tasks are Setup methods that may run concurrently with platform hooks and with each other.
+# A task may depend on other tasks and on platform hooks (e.g. 'common_first', 'linux'),
+# in which case it starts after these have finished. Dependencies on hooks that do not run on
+# the current platform are considered satisfied once all hooks but common_last have run.
+# All tasks complete before common_last.
+#
+# Tasks' output (including output of commands they run) is collected and printed as a whole
+# once each task completes.
+#
+#   class SystemSetup(paella.Setup):
+#       @paella.task()
+#       def git_lfs(self):
+#           ...
+#       @paella.task(after=['common_first'])
+#       def pip_packages(self):
+#           ...
+
+def task(after=None, name=None):
+    def decorator(f):
+        f.task_name = name if name is not None else f.__name__
+        f.task_after = [] if after is None else [after] if isinstance(after, str) else list(after)
+        return f
+    return decorator
+
+#----------------------------------------------------------------------------------------------
+
+_current = threading.local()
+
+def current_task():
+    return getattr(_current, 'task', None)
+
+class TaskOutput:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        task = current_task()
+        return (task.output if task is not None else self.stream).write(text)
+
+    def flush(self):
+        if current_task() is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+class Task:
+    def __init__(self, name, func, after):
+        self.name = name
+        self.func = func
+        self.after = after
+        self.output = StringIO()
+        self.submitted = False
+        self.failed = False
+
+#----------------------------------------------------------------------------------------------
+
+class Tasks:
+    def __init__(self, obj, jobs=4):
+        self.obj = obj
+        self.jobs = jobs
+        self.tasks = OrderedDict()
+        self.done = set()
+        self.running = 0
+        self.pool = None
+        self.cond = threading.Condition()
+        for klass in reversed(type(obj).__mro__):
+            for attr in vars(klass).values():
+                if callable(attr) and hasattr(attr, 'task_name'):
+                    self.add(attr.task_name, attr.__get__(obj), attr.task_after)
+
+    def add(self, name, func, after=None):
+        after = [] if after is None else [after] if isinstance(after, str) else list(after)
+        with self.cond:
+            if name in self.tasks:
+                raise Error("task %s already defined" % name)
+            t = self.tasks[name] = Task(name, func, after)
+            if self.pool is not None:
+                # added while tasks are running (e.g. by a platform hook)
+                self._check(t)
+                self._submit_ready()
+
+    # The pool is started even if there are no tasks yet, as tasks may be added by hooks
+    def start(self):
+        for t in self.tasks.values():
+            self._check(t)
+        self.stdout, self.stderr = sys.stdout, sys.stderr
+        sys.stdout, sys.stderr = TaskOutput(self.stdout), TaskOutput(self.stderr)
+        self.pool = ThreadPoolExecutor(max_workers=self.jobs)
+        with self.cond:
+            self._submit_ready()
+
+    def _check(self, t):
+        for dep in t.after:
+            if dep == 'common_last' or dep not in self.tasks and not callable(getattr(self.obj, dep, None)):
+                raise Error("task %s: invalid dependency %s" % (t.name, dep))
+        self._check_cycle(t, [])
+
+    def _check_cycle(self, t, path):
+        if t.name in path:
+            raise Error("task dependency cycle: %s" % " -> ".join(path + [t.name]))
+        for dep in t.after:
+            if dep in self.tasks:
+                self._check_cycle(self.tasks[dep], path + [t.name])
+
+    def hook_done(self, name):
+        with self.cond:
+            self.done.add(name)
+            if self.pool is not None:
+                self._submit_ready()
+
+    # waits for all tasks to complete
+    def finish(self):
+        if self.pool is None:
+            return
+        with self.cond:
+            # hooks that were not invoked by now will not be invoked on this platform
+            self.done.update(dep for t in self.tasks.values() for dep in t.after if dep not in self.tasks)
+            self._submit_ready()
+            while self.running > 0 or any(not t.submitted for t in self.tasks.values()):
+                self.cond.wait()
+        self.pool.shutdown()
+        self.pool = None
+        sys.stdout, sys.stderr = self.stdout, self.stderr
+        failed = [t.name for t in self.tasks.values() if t.failed]
+        if failed:
+            eprint("failed tasks: %s" % ", ".join(failed))
+            sys.exit(1)
+
+    def _submit_ready(self):
+        skipped = True
+        while skipped:
+            skipped = False
+            for t in self.tasks.values():
+                if t.submitted or not all(dep in self.done for dep in t.after):
+                    continue
+                t.submitted = True
+                if any(self.tasks[dep].failed for dep in t.after if dep in self.tasks):
+                    t.failed = True
+                    t.output.write("skipped: dependency failed\n")
+                    self._report(t, 0)
+                    self.done.add(t.name)
+                    skipped = True
+                    continue
+                self.running += 1
+                self.pool.submit(self._run, t)
+        self.cond.notify_all()
+
+    def _run(self, t):
+        t0 = time.time()
+        _current.task = t
+        try:
+            t.func()
+        except SystemExit as x:
+            t.failed = x.code not in [None, 0]
+        except BaseException:
+            t.failed = True
+            t.output.write(traceback.format_exc())
+        finally:
+            _current.task = None
+        with self.cond:
+            self._report(t, time.time() - t0)
+            self.running -= 1
+            self.done.add(t.name)
+            self._submit_ready()
+
+    def _report(self, t, secs):
+        self.stdout.write("## task %s: %s (%.1fs)\n" % (t.name, "failed" if t.failed else "done", secs))
+        self.stdout.write(t.output.getvalue())
+        self.stdout.flush()
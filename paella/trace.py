@@ -0,0 +1,113 @@
+
+import json
+import os
+import sys
+import threading
+import time
+from .cache import cache_dir
+from .tasks import current_task
+
+#----------------------------------------------------------------------------------------------
+
+# Execution trace of commands (Runner.run and sh) and other operations (hooks, downloads).
+# Events are written in Chrome trace format (load into chrome://tracing or ui.perfetto.dev),
+# one event per line; the closing bracket is omitted (which the format allows), so a trace
+# of an interrupted run is still valid.
+#
+# Tracing is started by Setup(trace=...) or READIES_TRACE, whose value is either 1 (trace
+# into cache_dir('trace')) or the path of the trace file.
+
+tracer = None
+
+def start(path=None):
+    global tracer
+    if tracer is None:
+        tracer = Tracer(path)
+    return tracer
+
+#----------------------------------------------------------------------------------------------
+
+# Waits for a Popen process; returns (exit code, resource usage)
+def wait(proc):
+    _, status, rusage = os.wait4(proc.pid, 0)
+    if os.WIFSIGNALED(status):
+        rc = -os.WTERMSIG(status)
+    else:
+        rc = os.WEXITSTATUS(status)
+    proc.returncode = rc
+    return rc, rusage
+
+# Like Popen.communicate, for a process with piped stdout and stderr;
+# returns (out, err, exit code, resource usage)
+def communicate(proc):
+    err = []
+    drain = threading.Thread(target=lambda: err.append(proc.stderr.read()))
+    drain.start()
+    out = proc.stdout.read()
+    drain.join()
+    proc.stdout.close()
+    proc.stderr.close()
+    rc, rusage = wait(proc)
+    return out, err[0], rc, rusage
+
+#----------------------------------------------------------------------------------------------
+
+class Tracer:
+    def __init__(self, path=None):
+        if path is None:
+            script = os.path.basename(sys.argv[0]) or 'python'
+            path = os.path.join(cache_dir('trace'), "{}-{}-{}.json".format(
+                script, time.strftime("%Y%m%d-%H%M%S"), os.getpid()))
+        self.path = os.path.abspath(path)
+        self.file = open(self.path, 'w')
+        self.file.write("[\n")
+        self.file.flush()
+        self.lock = threading.Lock()
+        self.t0 = time.time()
+        self.stage = None
+        self.hook = None
+        self.records = []
+
+    def set_hook(self, stage, hook):
+        self.stage = stage
+        self.hook = hook
+
+    # kind: "run", "sh", "download", "hook", ...
+    # rusage: as returned by os.wait4 (if available)
+    def record(self, kind, name, start, end, rc=None, rusage=None, **args):
+        task = current_task()
+        rec = {'kind': kind, 'name': name, 'wall': end - start, 'rc': rc,
+               'stage': self.stage, 'hook': self.hook, 'task': task.name if task is not None else None}
+        if rusage is not None:
+            rec['cpu'] = rusage.ru_utime + rusage.ru_stime
+            # ru_maxrss is in KB on Linux and in bytes on macOS
+            rec['maxrss'] = rusage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+        args.update({k: v for k, v in rec.items() if k not in ['kind', 'name', 'wall'] and v is not None})
+        event = {'name': name[:200], 'cat': kind, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                 'ts': int((start - self.t0) * 1e6), 'dur': int((end - start) * 1e6), 'args': args}
+        with self.lock:
+            self.records.append(rec)
+            self.file.write(json.dumps(event) + ",\n")
+            self.file.flush()
+
+    def summary(self, top=10):
+        with self.lock:
+            records = [r for r in self.records if r['kind'] != 'hook']
+            hooks = [r for r in self.records if r['kind'] == 'hook']
+        print("# trace: {} ({} commands, {:.1f}s)".format(
+            self.path, len(records), time.time() - self.t0))
+        if hooks != []:
+            print("#   {:>8}  {}".format("wall", "hook"))
+            for r in hooks:
+                print("#   {:>7.1f}s  {}".format(r['wall'], r['name']))
+        if records != []:
+            print("#   {:>8}  {:>8}  {:>8}  {:>4}  {:<16}  {}".format("wall", "cpu", "maxrss", "rc", "hook", "command"))
+            for r in sorted(records, key=lambda r: r['wall'], reverse=True)[:top]:
+                cpu = "{:.1f}s".format(r['cpu']) if 'cpu' in r else "-"
+                rss = "{:.0f}M".format(r['maxrss'] / 1048576.0) if 'maxrss' in r else "-"
+                where = "task:" + r['task'] if r['task'] is not None else r['hook'] or ""
+                cmd = r['name'].replace("\n", " ")
+                print("#   {:>7.1f}s  {:>8}  {:>8}  {:>4}  {:<16}  {}".format(
+                    r['wall'], cpu, rss, r['rc'] if r['rc'] is not None else "-", where,
+                    cmd if len(cmd) <= 80 else cmd[:77] + "..."))
+        sys.stdout.flush()
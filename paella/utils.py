@@ -1,9 +1,7 @@
 
 import sys
-import inspect
 import os.path
 from collections import namedtuple
-import dataclasses
 
 if sys.version_info > (3, 0):
     from .utils3 import *
@@ -13,7 +11,7 @@ else:
 #----------------------------------------------------------------------------------------------
 
 def current_filepath():
-    return os.path.abspath(inspect.getfile(inspect.currentframe().f_back))
+    return os.path.abspath(sys._getframe(1).f_code.co_filename)
 
 #----------------------------------------------------------------------------------------------
 
@@ -56,5 +54,6 @@ def to_dataclass(name, d):
         d = {}
     elif type(d) is not dict:
         raise TypeError("Not a dict")
+    import dataclasses
     D = dataclasses.make_dataclass(name, d)
     return D(**d)
@@ -3,7 +3,6 @@ from __future__ import print_function
 import os
 import sys
 from subprocess import Popen, PIPE
-import tempfile
 
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
@@ -17,17 +16,11 @@ class ShError(Exception):
 def sh(cmd, join=False, lines=False, fail=True):
     shell = isinstance(cmd, str)
     if shell:
-        # Popen with shell=True defaults to /bin/sh so in order to use bash and
-        # avoid quoting problems we write cmd into a temp file
-        fd, cmd_file = tempfile.mkstemp(prefix='/tmp/sh')
-        with open(cmd_file, 'w') as file:
-            file.write(cmd)
-        os.close(fd)
-        cmd = "/usr/bin/env bash {cmd_file}".format(cmd_file=cmd_file)
-    proc = Popen(cmd, shell=shell, stdout=PIPE, stderr=PIPE)
+        # Popen with shell=True defaults to /bin/sh, so bash is invoked explicitly
+        # (cmd is passed as a single argument, so no quoting is required)
+        cmd = ['bash', '-c', cmd]
+    proc = Popen(cmd, stdout=PIPE, stderr=PIPE)
     out, err = proc.communicate()
-    if shell:
-        os.unlink(cmd_file)
     out = out.strip()
     if lines is True:
         join = False
@@ -39,3 +32,7 @@ def sh(cmd, join=False, lines=False, fail=True):
     if proc.returncode != 0 and fail is True:
         raise ShError(err, out=out, retval=proc.returncode)
     return out
+
+def sh_iter(cmd, fail=True):
+    for line in sh(cmd, lines=True, fail=fail):
+        yield line
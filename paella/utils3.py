@@ -1,8 +1,7 @@
 
 import os
 import sys
-from subprocess import Popen, PIPE
-import tempfile
+import time
 
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
@@ -13,20 +12,67 @@ class ShError(Exception):
         self.out = out
         self.retval = retval
 
-def sh(cmd, join=False, lines=False, fail=True):
+# returns the active tracer, if tracing was started (see paella.trace)
+def _trace():
+    trace = sys.modules.get(__package__ + '.trace')
+    return trace if trace is not None and trace.tracer is not None else None
+
+# persistent: run cmd (a string) in a long-lived shell (see paella.shell)
+def sh(cmd, join=False, lines=False, fail=True, persistent=False):
     shell = isinstance(cmd, str)
+    trace = _trace()
+    t0 = time.time()
+    if shell and persistent:
+        from .shell import shared_shell
+        rc, out, err = shared_shell(login=False).run(cmd, errexit=False, capture="split")
+        if trace is not None:
+            trace.tracer.record('sh', cmd, t0, time.time(), rc)
+        return _sh_result(rc, out, err, join=join, lines=lines, fail=fail)
+    from subprocess import Popen, PIPE
+    name = cmd if shell else ' '.join(cmd)
     if shell:
-        # Popen with shell=True defaults to /bin/sh so in order to use bash and
-        # avoid quoting problems we write cmd into a temp file
-        fd, cmd_file = tempfile.mkstemp(prefix='/tmp/sh')
-        with open(cmd_file, 'w') as file:
-            file.write(cmd)
-        os.close(fd)
-        cmd = "/usr/bin/env bash {cmd_file}".format(cmd_file=cmd_file)
-    proc = Popen(cmd, shell=shell, stdout=PIPE, stderr=PIPE)
-    out, err = proc.communicate()
-    if shell:
-        os.unlink(cmd_file)
+        # Popen with shell=True defaults to /bin/sh, so bash is invoked explicitly
+        # (cmd is passed as a single argument, so no quoting is required)
+        cmd = ['bash', '-c', cmd]
+    proc = Popen(cmd, stdout=PIPE, stderr=PIPE)
+    if trace is None:
+        out, err = proc.communicate()
+    else:
+        out, err, _, rusage = trace.communicate(proc)
+        trace.tracer.record('sh', name, t0, time.time(), proc.returncode, rusage)
+    return _sh_result(proc.returncode, out, err, join=join, lines=lines, fail=fail)
+
+# Yields lines of cmd's output (without line terminators) as they are produced, rather than
+# collecting all of it first. If fail is True, ShError is raised once output is exhausted
+# if cmd has failed.
+def sh_iter(cmd, fail=True):
+    from subprocess import Popen, PIPE
+    import threading
+    trace = _trace()
+    t0 = time.time()
+    name = cmd if isinstance(cmd, str) else ' '.join(cmd)
+    if isinstance(cmd, str):
+        cmd = ['bash', '-c', cmd]
+    proc = Popen(cmd, stdout=PIPE, stderr=PIPE)
+    err = []
+    # stderr is drained concurrently so cmd does not block on it
+    drain = threading.Thread(target=lambda: err.append(proc.stderr.read()))
+    drain.start()
+    try:
+        for line in proc.stdout:
+            yield line.decode('utf-8').rstrip('\n')
+    finally:
+        proc.stdout.close()
+        if trace is None:
+            proc.wait()
+        else:
+            _, rusage = trace.wait(proc)
+            trace.tracer.record('sh', name, t0, time.time(), proc.returncode, rusage)
+        drain.join()
+    if proc.returncode != 0 and fail is True:
+        raise ShError(err[0].decode('utf-8'), retval=proc.returncode)
+
+def _sh_result(rc, out, err, join=False, lines=False, fail=True):
     out = out.decode('utf-8').strip()
     if lines is True:
         join = False
@@ -35,6 +81,6 @@ def sh(cmd, join=False, lines=False, fail=True):
     if join is not False:
         s = join if type(join) is str else ' '
         out = s.join(out)
-    if proc.returncode != 0 and fail is True:
-        raise ShError(err.decode('utf-8'), out=out, retval=proc.returncode)
+    if rc != 0 and fail is True:
+        raise ShError(err.decode('utf-8'), out=out, retval=rc)
     return out
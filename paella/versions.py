@@ -0,0 +1,157 @@
+
+import re
+from bisect import bisect_left, bisect_right
+from .contrib.version import Version
+from .error import *
+
+#----------------------------------------------------------------------------------------------
+
+# A set of version strings (e.g. tags), kept sorted by version, that answers range queries
+# by bisection:
+#
+#   7, 7.2, 7.2.4     versions with the given prefix (7.2 matches 7.2.x but not 7.20.x)
+#   =7.2.4, ==7.2.4   likewise
+#   >=7.2, >7.2       >7.2 means >=7.3.0 (likewise, <=7.2 means <7.3.0)
+#   <8, <=8.0.1       <8 excludes prereleases of 8.0.0
+#   ~7.2, ~7.2.3      same minor version (~7 means 7.x)
+#   ^7.2.3            same major version (same minor for 0.x)
+#   *, or empty       all versions
+#
+# Comma-separated clauses are combined (>=7.2,<8). Prereleases are excluded unless
+# prerelease=True is given.
+# Strings are mapped to versions with key (by default, a leading 'v' is dropped); strings that
+# are not versions are ignored.
+
+# prerelease part of sort keys of versions without prerelease (see Version.sort_key)
+RELEASE = Version('0.0.0').sort_key[3]
+
+class VersionSet:
+    def __init__(self, strings=(), key=None):
+        self.key = key if key is not None else VersionSet.no_v
+        self.all = []
+        for s in strings:
+            k = Version.key_of(self.key(s))
+            if k is not None:
+                self.all.append((k, s))
+        self.all.sort()
+        self.releases = [entry for entry in self.all if entry[0][3] == RELEASE]
+        self._keys = None
+
+    @staticmethod
+    def no_v(s):
+        return s[1:] if s.startswith('v') else s
+
+    def add(self, s):
+        k = Version.key_of(self.key(s))
+        if k is None:
+            return False
+        entry = (k, s)
+        for versions in [self.all] + ([self.releases] if k[3] == RELEASE else []):
+            versions.insert(bisect_right(versions, entry), entry)
+        self._keys = None
+        return True
+
+    def __len__(self):
+        return len(self.all)
+
+    def __contains__(self, s):
+        k = Version.key_of(self.key(s))
+        i = bisect_left(self.all, (k, s)) if k is not None else len(self.all)
+        return i < len(self.all) and self.all[i] == (k, s)
+
+    #------------------------------------------------------------------------------------------
+
+    # versions matching spec, from the highest
+    def select(self, spec="", prerelease=False):
+        versions, keys = self._index(prerelease)
+        lo, hi = self._range(keys, spec)
+        return [s for _, s in reversed(versions[lo:hi])]
+
+    # the highest version matching spec, or None
+    def latest(self, spec="", prerelease=False):
+        versions, keys = self._index(prerelease)
+        lo, hi = self._range(keys, spec)
+        return versions[hi - 1][1] if hi > lo else None
+
+    # the k highest versions matching spec (per major or minor version, if per is 'major' or
+    # 'minor'), from the highest
+    def top(self, spec="", k=1, per=None, prerelease=False):
+        if per not in [None, 'major', 'minor']:
+            raise Error("invalid grouping: %s" % per)
+        versions, keys = self._index(prerelease)
+        lo, hi = self._range(keys, spec)
+        if per is None:
+            return [s for _, s in reversed(versions[max(lo, hi - k):hi])]
+        n = 1 if per == 'major' else 2
+        result = []
+        while hi > lo:
+            # take the top k of the group of versions[hi - 1], then skip to the next group
+            group = keys[hi - 1][0:n]
+            start = max(lo, bisect_left(keys, group, lo, hi))
+            result += [s for _, s in reversed(versions[max(start, hi - k):hi])]
+            hi = start
+        return result
+
+    #------------------------------------------------------------------------------------------
+
+    def _index(self, prerelease):
+        if self._keys is None:
+            self._keys = ([k for k, _ in self.all], [k for k, _ in self.releases])
+        if prerelease:
+            return self.all, self._keys[0]
+        return self.releases, self._keys[1]
+
+    def _range(self, keys, spec):
+        lo, hi = 0, len(keys)
+        for clause in spec.split(','):
+            clause = clause.strip()
+            if clause in ['', '*']:
+                continue
+            m = re.match(r'^(>=|<=|==|=|>|<|~|\^)?\s*v?(.+)$', clause)
+            if not m:
+                raise Error("invalid version spec: %s" % clause)
+            op = m.group(1) or '='
+            try:
+                v = Version(m.group(2), partial=True)
+            except ValueError:
+                raise Error("invalid version spec: %s" % clause)
+            partial = v.minor is None or v.patch is None
+            # first: lowest key of versions with the given prefix (including prereleases)
+            first = (v.major, v.minor or 0, v.patch or 0, ())
+            if op in ['=', '==']:
+                if partial:
+                    lo = max(lo, bisect_left(keys, first))
+                    hi = min(hi, bisect_left(keys, VersionSet._bump(v)))
+                else:
+                    lo = max(lo, bisect_left(keys, v.sort_key))
+                    hi = min(hi, bisect_right(keys, v.sort_key))
+            elif op == '>=':
+                lo = max(lo, bisect_left(keys, v.sort_key))
+            elif op == '>':
+                lo = max(lo, bisect_left(keys, VersionSet._bump(v)) if partial else bisect_right(keys, v.sort_key))
+            elif op == '<':
+                hi = min(hi, bisect_left(keys, v.sort_key if v.prerelease else first))
+            elif op == '<=':
+                hi = min(hi, bisect_left(keys, VersionSet._bump(v)) if partial else bisect_right(keys, v.sort_key))
+            elif op == '~':
+                lo = max(lo, bisect_left(keys, v.sort_key if not partial else first))
+                if v.minor is None:
+                    hi = min(hi, bisect_left(keys, (v.major + 1, 0, 0, ())))
+                else:
+                    hi = min(hi, bisect_left(keys, (v.major, v.minor + 1, 0, ())))
+            elif op == '^':
+                lo = max(lo, bisect_left(keys, v.sort_key if not partial else first))
+                if v.major > 0 or v.minor is None:
+                    hi = min(hi, bisect_left(keys, (v.major + 1, 0, 0, ())))
+                elif v.minor > 0 or v.patch is None:
+                    hi = min(hi, bisect_left(keys, (0, v.minor + 1, 0, ())))
+                else:
+                    hi = min(hi, bisect_left(keys, (0, 0, v.patch + 1, ())))
+        return lo, max(lo, hi)
+
+    # lowest key above all versions with the prefix of partial version v
+    @staticmethod
+    def _bump(v):
+        if v.minor is None:
+            return (v.major + 1, 0, 0, ())
+        return (v.major, v.minor + 1, 0, ())
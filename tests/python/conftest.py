@@ -0,0 +1,85 @@
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse
+
+import pytest
+
+READIES = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, READIES)
+import paella  # noqa: F401
+
+#----------------------------------------------------------------------------------------------
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        # a request for an absolute URL is one sent to a proxy
+        proxied = self.path.startswith("http://")
+        path = urlparse(self.path).path if proxied else self.path.split("?")[0]
+        server.requests.append({'path': path, 'proxied': proxied, 'headers': dict(self.headers)})
+        if path not in server.files:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = server.files[path]
+        start = 0
+        rng = self.headers.get("Range")
+        if rng is not None and rng.startswith("bytes=") and server.ranges:
+            start = int(rng[len("bytes="):].split("-")[0])
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", "bytes %d-%d/%d" % (start, len(body) - 1, len(body)))
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        self.wfile.write(body[start:])
+
+# A local HTTP server serving server.files ({path: bytes}), with range requests (unless
+# server.ranges is False). It also serves as an HTTP proxy for itself. Requests are recorded
+# in server.requests.
+
+@pytest.fixture
+def http_server():
+    server = _Server(("127.0.0.1", 0), _Handler)
+    server.files = {}
+    server.requests = []
+    server.ranges = True
+    server.url = "http://127.0.0.1:%d" % server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def no_proxy_env(monkeypatch):
+    for var in ["http_proxy", "https_proxy", "HTTP_PROXY", "HTTPS_PROXY", "all_proxy", "ALL_PROXY",
+                "no_proxy", "NO_PROXY"]:
+        monkeypatch.delenv(var, raising=False)
+    paella.files._connections.pool = {}
+    yield
+    paella.files._connections.pool = {}
+
+@pytest.fixture
+def cache_root(tmp_path, monkeypatch):
+    root = tmp_path / "cache"
+    monkeypatch.setenv("READIES_CACHE_DIR", str(root))
+    return root
@@ -0,0 +1,80 @@
+
+import importlib.machinery
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("jinja2")
+
+READIES = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+def load_dockerama():
+    loader = importlib.machinery.SourceFileLoader("dockerama", os.path.join(READIES, "bin", "dockerama"))
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+dockerama = load_dockerama()
+
+def parse(log):
+    steps = dockerama.BuildSteps()
+    with open(os.path.join(DATA, log)) as file:
+        for line in file:
+            steps.feed(line)
+    return steps
+
+#----------------------------------------------------------------------------------------------
+
+def test_multistage_build():
+    steps = parse("buildkit-multistage.log")
+    assert [s.name for s in steps.cached] == ["[builder 2/4] RUN apt-get update && apt-get install -y build-essential"]
+    executed = {s.name: s.time for s in steps.executed}
+    assert executed["[builder 4/4] RUN make -C /build"] == 13.0
+    # interleaved output of concurrent stages is attributed to the right steps
+    assert executed["[stage-1 2/3] RUN apt-get update && apt-get install -y ca-certificates"] == 3.9
+    assert len(executed) == 10
+    summary = steps.summary(top=3).splitlines()
+    assert summary[0] == "# build steps: 10 executed (19.0s), 1 cached"
+    assert summary[1].endswith("s  [builder 4/4] RUN make -C /build") and "13.0s" in summary[1]
+    assert len(summary) == 1 + 3 + 1
+
+def test_failed_build():
+    steps = parse("buildkit-error.log")
+    failed = [s for s in steps.steps.values() if s.status == "error"]
+    assert [s.name for s in failed] == ["[4/4] RUN make -C /build"]
+    assert len(steps.cached) == 2
+    summary = steps.summary()
+    assert "1 failed" in summary.splitlines()[0]
+    assert "# {:>9}  [4/4] RUN make -C /build".format("error") in summary.splitlines()
+
+def test_canceled_step():
+    steps = parse("buildkit-canceled.log")
+    assert steps.steps[8].status == "canceled"
+    assert steps.steps[9].status == "running"
+
+def test_no_steps():
+    steps = dockerama.BuildSteps()
+    steps.feed("Sending build context to Docker daemon  2.048kB\n")
+    assert steps.summary() == ""
+
+#----------------------------------------------------------------------------------------------
+
+def test_build_output_is_streamed_in_full(tmp_path):
+    (tmp_path / "ctx").mkdir()
+    (tmp_path / "dockerfile.tmpl").write_text("FROM scratch\n")
+    env = dict(os.environ, FAKEDOCKER_STATE=str(tmp_path / "state.json"),
+               FAKEDOCKER_BUILD_LOG=os.path.join(DATA, "buildkit-canceled.log"),
+               PYTHONPATH=os.pathsep.join(sys.path))
+    res = subprocess.run([sys.executable, os.path.join(READIES, "bin", "dockerama"),
+                          "--docker", "%s %s" % (sys.executable, os.path.join(DATA, "fakedocker")),
+                          "--build-dir", "ctx", "-t", "img:1"],
+                         cwd=str(tmp_path), env=env, stdout=subprocess.PIPE, universal_newlines=True)
+    lines = res.stdout.splitlines()
+    # the last line, without a newline, is not lost when the process exits
+    assert lines[0:3] == ["#8 [stage 2/2] RUN sleep 100", "#8 CANCELED", "#9 tail line without newline"]
+    assert "canceled  [stage 2/2] RUN sleep 100" in res.stdout
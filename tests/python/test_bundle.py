@@ -0,0 +1,49 @@
+
+import os
+import tarfile
+
+from paella.bundle import Bundle
+
+#----------------------------------------------------------------------------------------------
+
+def record(bundle, packs, files):
+    dir = bundle.new_packages_dir('deb')
+    for f in files:
+        open(os.path.join(dir, f), 'w').close()
+    bundle.add_packages('deb', packs, dir)
+
+def names(files):
+    return sorted(os.path.basename(f) for f in files)
+
+def test_find_packages_by_name(tmp_path):
+    bundle = Bundle(str(tmp_path / "bundle"), 'record')
+    record(bundle, "gcc make", ["gcc.deb", "libc-dev.deb", "make.deb"])
+    record(bundle, "curl", ["curl.deb", "libcurl.deb"])
+
+    replay = Bundle(str(tmp_path / "bundle"), 'replay')
+    files, missing = replay.find_packages('deb', "make curl")
+    assert names(files) == ["curl.deb", "gcc.deb", "libc-dev.deb", "libcurl.deb", "make.deb"]
+    assert missing == []
+
+    files, missing = replay.find_packages('deb', "curl wget")
+    assert names(files) == ["curl.deb", "libcurl.deb"]
+    assert missing == ["wget"]
+
+def test_files_are_listed_once(tmp_path):
+    bundle = Bundle(str(tmp_path / "bundle"), 'record')
+    record(bundle, "a", ["a.deb", "common.deb"])
+    record(bundle, "b", ["b.deb", "common.deb"])
+    files, missing = bundle.find_packages('deb', "a b")
+    assert names(files) == ["a.deb", "b.deb", "common.deb"]
+
+def test_tarball_bundle(tmp_path):
+    path = str(tmp_path / "bundle.tgz")
+    bundle = Bundle(path, 'record')
+    record(bundle, "a", ["a.deb"])
+    bundle.close()
+    with tarfile.open(path) as tar:
+        assert "manifest.json" in tar.getnames()
+    replay = Bundle(path, 'replay')
+    files, missing = replay.find_packages('deb', "a")
+    assert names(files) == ["a.deb"] and missing == []
+    replay.close()
@@ -0,0 +1,72 @@
+
+import hashlib
+import os
+
+import pytest
+
+import paella
+from paella.cache import DownloadCache, cached_download
+
+#----------------------------------------------------------------------------------------------
+
+@pytest.fixture
+def served(http_server, no_proxy_env, cache_root, monkeypatch):
+    monkeypatch.delenv('READIES_DOWNLOAD_CACHE', raising=False)
+    data = os.urandom(200000)
+    http_server.files["/pkg.tgz"] = data
+    http_server.data = data
+    http_server.sha256 = hashlib.sha256(data).hexdigest()
+    return http_server
+
+def test_downloaded_once(served):
+    url = served.url + "/pkg.tgz"
+    path = cached_download(url)
+    assert open(path, 'rb').read() == served.data
+    assert cached_download(url) == path
+    assert len(served.requests) == 1
+
+def test_dest_is_linked_or_copied(served, tmp_path):
+    path = cached_download(served.url + "/pkg.tgz", dest=str(tmp_path))
+    assert path == str(tmp_path / "pkg.tgz")
+    assert open(path, 'rb').read() == served.data
+
+def test_checksum(served):
+    url = served.url + "/pkg.tgz"
+    assert cached_download(url, sha256=served.sha256.upper())
+    served.files["/other.tgz"] = b"other"
+    url = served.url + "/other.tgz"
+    with pytest.raises(paella.Error):
+        cached_download(url, sha256="0" * 64)
+    assert not os.path.exists(DownloadCache().path(url))
+    assert not os.path.exists(DownloadCache().path(url) + ".part")
+
+def test_cached_file_with_wrong_checksum_is_fetched_again(served):
+    url = served.url + "/pkg.tgz"
+    path = cached_download(url)
+    with open(path, 'wb') as file:
+        file.write(b"corrupt")
+    os.remove(path + ".sha256")
+    assert open(cached_download(url, sha256=served.sha256), 'rb').read() == served.data
+    assert len(served.requests) == 2
+
+def test_partial_download_is_resumed(served):
+    url = served.url + "/pkg.tgz"
+    part = DownloadCache().path(url) + ".part"
+    paella.mkdir_p(os.path.dirname(part))
+    with open(part, 'wb') as file:
+        file.write(served.data[0:50000])
+    assert open(cached_download(url, sha256=served.sha256), 'rb').read() == served.data
+    assert served.requests[-1]['headers'].get('Range') == 'bytes=50000-'
+
+def test_stale_partial_download_is_refetched(served):
+    url = served.url + "/pkg.tgz"
+    part = DownloadCache().path(url) + ".part"
+    paella.mkdir_p(os.path.dirname(part))
+    with open(part, 'wb') as file:
+        file.write(b"x" * 50000)
+    assert open(cached_download(url, sha256=served.sha256), 'rb').read() == served.data
+
+def test_cache_root(served, tmp_path, monkeypatch):
+    monkeypatch.setenv('READIES_DOWNLOAD_CACHE', str(tmp_path / "downloads"))
+    path = cached_download(served.url + "/pkg.tgz")
+    assert path.startswith(str(tmp_path / "downloads"))
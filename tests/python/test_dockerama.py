@@ -0,0 +1,140 @@
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("jinja2")
+
+READIES = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DOCKERAMA = os.path.join(READIES, "bin", "dockerama")
+FAKEDOCKER = os.path.join(os.path.dirname(__file__), "data", "fakedocker")
+
+#----------------------------------------------------------------------------------------------
+
+class Dockerama(object):
+    def __init__(self, tmp_path):
+        self.dir = tmp_path
+        self.state = str(tmp_path / "state.json")
+        (tmp_path / "ctx").mkdir()
+        (tmp_path / "ctx" / "file").write_text("x")
+        (tmp_path / "dockerfile.tmpl").write_text("FROM base:1\nRUN echo {{X}}\n")
+        self.set_registry("base:1", "sha256:base1")
+
+    def load(self):
+        with open(self.state) as file:
+            return json.load(file)
+
+    def save(self, st):
+        with open(self.state, "w") as file:
+            json.dump(st, file)
+
+    def set_registry(self, tag, id):
+        st = self.load() if os.path.exists(self.state) else {"images": {}, "registry": {}, "log": []}
+        st["registry"][tag] = id
+        self.save(st)
+
+    def commands(self, cmd):
+        return [e for e in self.load()["log"] if e["args"][0] == cmd]
+
+    def clear_log(self):
+        st = self.load()
+        st["log"] = []
+        self.save(st)
+
+    def __call__(self, *args, **env):
+        environ = dict(os.environ, FAKEDOCKER_STATE=self.state, PYTHONPATH=os.pathsep.join(sys.path))
+        environ.update(env)
+        return subprocess.run([sys.executable, DOCKERAMA, "--docker", "%s %s" % (sys.executable, FAKEDOCKER),
+                               "--build-dir", "ctx", "-d", "X=1"] + list(args),
+                              cwd=str(self.dir), env=environ, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              universal_newlines=True)
+
+@pytest.fixture
+def dockerama(tmp_path):
+    return Dockerama(tmp_path)
+
+#----------------------------------------------------------------------------------------------
+
+def test_unchanged_build_is_skipped(dockerama):
+    assert dockerama("-t", "img:1").returncode == 0
+    assert len(dockerama.commands("build")) == 1
+    res = dockerama("-t", "img:1")
+    assert res.returncode == 0 and "up to date" in res.stdout
+    assert len(dockerama.commands("build")) == 1
+
+def test_base_image_update_rebuilds(dockerama):
+    dockerama("-t", "img:1")
+    dockerama.set_registry("base:1", "sha256:base2")
+    dockerama("-t", "img:1")
+    assert len(dockerama.commands("build")) == 2
+
+def test_unchanged_image_is_pushed_if_not_in_registry(dockerama):
+    dockerama("-t", "img:1")
+    res = dockerama("-t", "img:1", "-P")
+    assert res.returncode == 0
+    assert "up to date (inputs digest" in res.stdout
+    assert [e["args"] for e in dockerama.commands("push")] == [["push", "img:1"]]
+
+def test_failed_push_is_retried(dockerama):
+    assert dockerama("-t", "img:1", "-P", FAKEDOCKER_PUSH_FAIL="1").returncode != 0
+    assert dockerama("-t", "img:1", "-P").returncode == 0
+    assert dockerama.load()["registry"].get("img:1") is not None
+
+def test_image_in_registry_is_not_pushed(dockerama):
+    dockerama("-t", "img:1", "-T", "img:latest", "-P")
+    dockerama.clear_log()
+    res = dockerama("-t", "img:1", "-T", "img:latest", "-P")
+    assert res.returncode == 0 and "up to date in the registry" in res.stdout
+    assert dockerama.commands("push") == []
+
+#----------------------------------------------------------------------------------------------
+
+def max_concurrency(entries):
+    events = sorted([(e["start"], 1) for e in entries] + [(e["end"], -1) for e in entries])
+    n = peak = 0
+    for _, d in events:
+        n += d
+        peak = max(peak, n)
+    return peak
+
+def write_matrix(dockerama, cells):
+    path = dockerama.dir / "matrix.json"
+    path.write_text(json.dumps(cells))
+    return str(path)
+
+def test_matrix_builds_concurrently(dockerama):
+    matrix = write_matrix(dockerama, {"X": ["1", "2", "3", "4"]})
+    res = dockerama("-t", "img:{{X}}", "-m", matrix, "-j", "4", FAKEDOCKER_BUILD_SECS="1")
+    assert res.returncode == 0, res.stdout
+    builds = dockerama.commands("build")
+    assert sorted(e["args"][2] for e in builds) == ["img:1", "img:2", "img:3", "img:4"]
+    assert max_concurrency(builds) >= 2
+    assert "[X=3] #1 [1/1] RUN build img:3" in res.stdout.splitlines()
+
+def test_matrix_jobs_limit(dockerama):
+    matrix = write_matrix(dockerama, {"X": ["1", "2", "3", "4"]})
+    assert dockerama("-t", "img:{{X}}", "-m", matrix, "-j", "2", FAKEDOCKER_BUILD_SECS="0.5").returncode == 0
+    assert max_concurrency(dockerama.commands("build")) <= 2
+
+def test_matrix_failures(dockerama):
+    matrix = write_matrix(dockerama, [{"X": "1"}, {"X": "fail"}])
+    res = dockerama("-t", "img:{{X}}", "-m", matrix, "-j", "2")
+    assert res.returncode == 1
+    summary = {line.split()[1]: line.split(None, 2)[2] for line in res.stdout.splitlines() if line.startswith("# X=")}
+    assert summary["X=1"].startswith("ok")
+    assert summary["X=fail"].startswith("build failed")
+
+def test_generic_env_vars_are_ignored(dockerama):
+    res = dockerama("-t", "img:1", JOBS="auto", DOCKER="1", MATRIX="none.json", FORCE="1")
+    assert res.returncode == 0, res.stdout
+    assert len(dockerama.commands("build")) == 1
+
+def test_env_vars_override_options(dockerama):
+    matrix = write_matrix(dockerama, {"X": ["1", "2"]})
+    assert dockerama("-t", "img:{{X}}", DOCKER_MATRIX=matrix, DOCKER_JOBS="2").returncode == 0
+    assert len(dockerama.commands("build")) == 2
+    res = dockerama("-t", "img:1", DOCKER_JOBS="auto")
+    assert res.returncode == 2 and "DOCKER_JOBS: invalid integer value: 'auto'" in res.stdout
@@ -0,0 +1,118 @@
+
+import importlib.machinery
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+pytest.importorskip("requests")
+
+READIES = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DOCKERHUB_LS = os.path.join(READIES, "bin", "dockerhub-ls")
+
+def load_script():
+    loader = importlib.machinery.SourceFileLoader("dockerhub_ls", DOCKERHUB_LS)
+    spec = importlib.util.spec_from_loader(loader.name, loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+#----------------------------------------------------------------------------------------------
+
+@pytest.mark.parametrize("text, expected", [
+    ("2024-01-02T03:04:05Z", datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)),
+    ("2024-01-02T03:04:05.12345Z", datetime(2024, 1, 2, 3, 4, 5, 123450, tzinfo=timezone.utc)),
+    ("2024-01-02T03:04:05.1Z", datetime(2024, 1, 2, 3, 4, 5, 100000, tzinfo=timezone.utc)),
+    ("2024-01-02T03:04:05.123456789Z", datetime(2024, 1, 2, 3, 4, 5, 123456, tzinfo=timezone.utc)),
+    ("2024-01-02T03:04:05.5+0200", datetime(2024, 1, 2, 1, 4, 5, 500000, tzinfo=timezone.utc)),
+    ("2024-01-02T03:04:05", datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)),
+])
+def test_parse_time(text, expected):
+    assert load_script().parse_time(text) == expected
+
+#----------------------------------------------------------------------------------------------
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class _HubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        u = urlparse(self.path)
+        q = parse_qs(u.query)
+        page, n = int(q.get('page', ['1'])[0]), int(q['page_size'][0])
+        server.requests.append(self.path)
+        parts = u.path.strip('/').split('/')
+        if parts[-1] == 'tags':
+            items = [{'name': name, 'last_updated': t, 'last_updater_username': 'bob'}
+                     for name, t in server.images[parts[-2]]]
+        else:
+            items = [{'name': img, 'last_updated': tags[0][1]} for img, tags in server.images.items()]
+        next = None
+        if page * n < len(items):
+            next = "%s%s?page_size=%d&page=%d" % (server.url, u.path, n, page + 1)
+        body = json.dumps({'count': len(items), 'next': next, 'results': items[(page - 1) * n:page * n]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def timestamp(days_ago):
+    # fractions of seconds of 5 digits, as returned by Dockerhub
+    t = datetime.now(timezone.utc) - timedelta(days=days_ago)
+    return t.strftime("%Y-%m-%dT%H:%M:%S.") + "%05d" % (t.microsecond // 10) + "Z"
+
+@pytest.fixture
+def hub(no_proxy_env):
+    server = _Server(("127.0.0.1", 0), _HubHandler)
+    server.url = "http://127.0.0.1:%d" % server.server_address[1]
+    server.images = {"img%d" % i: [("t%d" % j, timestamp(j * 10)) for j in range(0, 150)] for i in range(0, 4)}
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def dockerhub_ls(hub, cache_root, *args):
+    env = dict(os.environ, READIES_DOCKERHUB_API=hub.url, READIES_CACHE_DIR=str(cache_root),
+               PYTHONPATH=os.pathsep.join(sys.path))
+    res = subprocess.run([sys.executable, DOCKERHUB_LS, "-o", "org"] + list(args), env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    assert res.returncode == 0, res.stdout
+    return [line for line in res.stdout.splitlines() if not line.startswith("#")]
+
+def test_scan(hub, cache_root):
+    lines = dockerhub_ls(hub, cache_root, "--days", "55")
+    for img in hub.images:
+        assert [l.split(":")[0] for l in lines if l.startswith(img + "/")] == \
+            ["%s/t%d" % (img, j) for j in range(0, 6)]
+    # tags are ordered by time, so pagination stops at the first page with old tags
+    assert len(hub.requests) == 1 + len(hub.images)
+
+def test_cached_rescan(hub, cache_root):
+    first = dockerhub_ls(hub, cache_root, "--days", "55")
+    hub.requests = []
+    assert sorted(dockerhub_ls(hub, cache_root, "--days", "55")) == sorted(first)
+    assert len(hub.requests) == 1
+
+def test_updated_image_is_rescanned(hub, cache_root):
+    dockerhub_ls(hub, cache_root, "--days", "55")
+    hub.images["img1"].insert(0, ("new", timestamp(0)))
+    hub.requests = []
+    lines = dockerhub_ls(hub, cache_root, "--days", "55")
+    assert any(l.startswith("img1/new:") for l in lines)
+    assert len(hub.requests) == 2
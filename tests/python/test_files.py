@@ -0,0 +1,71 @@
+
+import os
+import socket
+
+import pytest
+
+import paella
+from paella.files import wget, wget_many
+
+#----------------------------------------------------------------------------------------------
+
+def test_wget_streams_to_dest(http_server, no_proxy_env, tmp_path):
+    http_server.files["/a.bin"] = os.urandom(3 * 1024 * 1024 + 17)
+    dest = wget(http_server.url + "/a.bin", dest=str(tmp_path / "a.bin"))
+    assert open(dest, 'rb').read() == http_server.files["/a.bin"]
+    assert not os.path.exists(dest + ".part")
+
+def test_wget_resumes_partial_download(http_server, no_proxy_env, tmp_path):
+    data = os.urandom(100000)
+    http_server.files["/b.bin"] = data
+    dest = tmp_path / "b.bin"
+    with open(str(dest) + ".part", 'wb') as file:
+        file.write(data[0:40000])
+    wget(http_server.url + "/b.bin", dest=str(dest), resume=True)
+    assert dest.read_bytes() == data
+    assert http_server.requests[-1]['headers'].get('Range') == 'bytes=40000-'
+
+def test_wget_many(http_server, no_proxy_env, tmp_path):
+    for i in range(0, 6):
+        http_server.files["/f%d" % i] = b"file %d" % i
+    paths = wget_many([http_server.url + "/f%d" % i for i in range(0, 6)], dir=str(tmp_path), jobs=3)
+    assert [open(p, 'rb').read() for p in paths] == [b"file %d" % i for i in range(0, 6)]
+
+#----------------------------------------------------------------------------------------------
+
+def _dead_port():
+    s = socket.socket()
+    s.bind(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+def test_http_proxy_is_used(http_server, no_proxy_env, monkeypatch, tmp_path):
+    http_server.files["/p"] = b"via proxy"
+    # the proxy is the server itself, and the URL's host does not resolve
+    monkeypatch.setenv("http_proxy", http_server.url)
+    dest = wget("http://origin.invalid/p", dest=str(tmp_path / "p"))
+    assert open(dest, 'rb').read() == b"via proxy"
+    assert http_server.requests[-1]['proxied']
+
+def test_dead_proxy_is_not_bypassed(http_server, no_proxy_env, monkeypatch, tmp_path):
+    http_server.files["/p"] = b"direct"
+    monkeypatch.setenv("http_proxy", "http://127.0.0.1:%d" % _dead_port())
+    with pytest.raises(Exception):
+        wget(http_server.url + "/p", dest=str(tmp_path / "p"))
+    assert http_server.requests == []
+
+def test_no_proxy(http_server, no_proxy_env, monkeypatch, tmp_path):
+    http_server.files["/p"] = b"direct"
+    monkeypatch.setenv("http_proxy", "http://127.0.0.1:%d" % _dead_port())
+    monkeypatch.setenv("no_proxy", "127.0.0.1")
+    dest = wget(http_server.url + "/p", dest=str(tmp_path / "p"))
+    assert open(dest, 'rb').read() == b"direct"
+    assert not http_server.requests[-1]['proxied']
+
+def test_https_proxy_tunnel(no_proxy_env, monkeypatch):
+    monkeypatch.setenv("https_proxy", "http://user:pw@proxy.invalid:3128")
+    conn = paella.files._connection('https', 'example.com')
+    assert (conn.host, conn.port) == ("proxy.invalid", 3128)
+    assert conn._tunnel_host == "example.com"
+    assert conn._tunnel_headers['Proxy-Authorization'] == 'Basic dXNlcjpwdw=='
@@ -0,0 +1,43 @@
+
+import json
+import os
+import subprocess
+import sys
+
+READIES = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+# 'import paella' should stay cheap: heavier submodules are loaded lazily (see paella/__init__.py).
+# The budget (in ms) can be set with READIES_IMPORT_BUDGET_MS, e.g. for slow CI machines.
+IMPORT_BUDGET_MS = float(os.environ.get('READIES_IMPORT_BUDGET_MS', '150'))
+
+PROBE = r'''
+import json, sys, time
+sys.path.insert(0, %r)
+t0 = time.perf_counter()
+import paella
+t = time.perf_counter() - t0
+print(json.dumps({'ms': t * 1000, 'modules': sorted(sys.modules)}))
+''' % READIES
+
+def import_paella():
+    res = subprocess.run([sys.executable, "-c", PROBE], stdout=subprocess.PIPE, check=True)
+    return json.loads(res.stdout.decode('utf-8'))
+
+#----------------------------------------------------------------------------------------------
+
+def test_import_time_budget():
+    # the fastest of a few runs, to discount noise
+    ms = min(import_paella()['ms'] for _ in range(0, 3))
+    assert ms < IMPORT_BUDGET_MS, "import paella took %.1fms (budget: %.0fms)" % (ms, IMPORT_BUDGET_MS)
+
+def test_heavy_modules_are_lazy():
+    modules = set(import_paella()['modules'])
+    for module in ['paella.platform', 'paella.setup', 'paella.cache', 'paella.tags', 'paella.contrib.version',
+                   'subprocess', 'http.client', 'urllib.request', 'concurrent.futures']:
+        assert module not in modules
+
+def test_lazy_names():
+    import paella
+    assert paella.Version("1.2.3") < paella.Version("1.10.0")
+    assert callable(paella.cached_download) and isinstance(paella.Setup, type)
+    assert 'Setup' in dir(paella)
@@ -0,0 +1,41 @@
+
+import paella
+from paella.setup import PackageManager
+
+#----------------------------------------------------------------------------------------------
+
+class FakePackageManager(PackageManager):
+    def __init__(self):
+        PackageManager.__init__(self, runner=None)
+        self.calls = []
+
+    def query_installed(self):
+        return set()
+
+    def _install(self, packs, group=False, output="on_error", _try=False):
+        self.calls.append((packs, output, _try))
+        return 0
+
+def new_setup(monkeypatch):
+    monkeypatch.delenv('READIES_BATCH_INSTALL', raising=False)
+    s = paella.Setup(nop=True, sudo=False, batch=True)
+    s.nop = False
+    s.package_manager = FakePackageManager()
+    s.package_manager.defer()
+    return s
+
+def test_deferred_installs_keep_output(monkeypatch):
+    s = new_setup(monkeypatch)
+    s.install("a b", output=False)
+    s.install("c", output=True, _try=True)
+    assert s.package_manager.calls == []
+    s.flush_install()
+    assert s.package_manager.calls == [("a b c", True, True)]
+
+def test_download_flushes_deferred_installs(monkeypatch):
+    s = new_setup(monkeypatch)
+    s.install("ca-certificates")
+    monkeypatch.setattr(paella, 'cached_download',
+                        lambda url, **kw: s.package_manager.calls.append(('download', url)) or "/dev/null")
+    s.download("https://example.com/f")
+    assert s.package_manager.calls == [("ca-certificates", "on_error", True), ('download', "https://example.com/f")]
@@ -0,0 +1,45 @@
+
+import paella
+from paella.setup import Apt
+
+#----------------------------------------------------------------------------------------------
+
+DPKG_QUERY = [
+    "install ok installed\tbash",
+    "install ok installed\tlibc6:amd64",
+    "install ok installed\tlibssl3:i386",
+    "deinstall ok config-files\tlibfoo",
+]
+
+def test_apt_foreign_arch_packages(monkeypatch):
+    monkeypatch.setattr(paella, 'sh', lambda cmd, **kw: "amd64\n")
+    monkeypatch.setattr(paella, 'sh_iter', lambda cmd, **kw: iter(DPKG_QUERY))
+    apt = Apt(runner=None)
+    assert apt.missing("bash bash:amd64 libc6 libc6:amd64 libssl3 libssl3:i386 libfoo") == ["libssl3", "libfoo"]
+
+def test_options_pass_whole_request(monkeypatch):
+    monkeypatch.setattr(paella, 'sh', lambda cmd, **kw: "amd64\n")
+    monkeypatch.setattr(paella, 'sh_iter', lambda cmd, **kw: iter(DPKG_QUERY))
+    apt = Apt(runner=None)
+    assert apt.missing("-t bullseye-backports bash libfoo") == ["-t", "bullseye-backports", "bash", "libfoo"]
+
+def test_uninstall_drops_snapshot(monkeypatch):
+    queries = []
+    def sh_iter(cmd, **kw):
+        queries.append(cmd)
+        return iter(DPKG_QUERY)
+    monkeypatch.setattr(paella, 'sh', lambda cmd, **kw: "amd64\n")
+    monkeypatch.setattr(paella, 'sh_iter', sh_iter)
+    apt = Apt(runner=None)
+    installs = []
+    monkeypatch.setattr(apt, '_install', lambda packs, **kw: installs.append(packs) or 0)
+    monkeypatch.setattr(apt, '_uninstall', lambda packs, **kw: 0)
+    assert apt.install("bash") == 0 and installs == []
+    assert len(queries) == 1
+    # removing libc6 also removes packages that depend on it, like bash
+    DPKG_QUERY_AFTER = [line for line in DPKG_QUERY if not line.endswith(("bash", "libc6:amd64"))]
+    monkeypatch.setattr(paella, 'sh_iter', lambda cmd, **kw: queries.append(cmd) or iter(DPKG_QUERY_AFTER))
+    assert apt.uninstall("libc6") == 0
+    assert apt.install("bash") == 0
+    assert installs == ["bash"]
+    assert len(queries) == 2
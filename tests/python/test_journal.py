@@ -0,0 +1,31 @@
+
+import paella
+
+#----------------------------------------------------------------------------------------------
+
+def test_completed_steps_are_skipped(cache_root, tmp_path, capsys):
+    marker = tmp_path / "count"
+    cmd = "echo x >> {}".format(marker)
+    s = paella.Setup(sudo=False, journal=True)
+    s.run(cmd, at=str(tmp_path))
+    s = paella.Setup(sudo=False, journal=True)
+    s.run(cmd, at=str(tmp_path))
+    assert marker.read_text() == "x\n"
+    assert "done in previous run" in capsys.readouterr().out
+
+def test_probes_are_not_journaled(cache_root):
+    s = paella.Setup(sudo=True, journal=True)
+    assert s.journal.steps == {}
+
+def test_no_journal(cache_root, tmp_path):
+    marker = tmp_path / "count"
+    cmd = "echo x >> {}".format(marker)
+
+    class S(paella.Setup):
+        @paella.no_journal
+        def step(self):
+            self.run(cmd)
+
+    S(sudo=False, journal=True).step()
+    S(sudo=False, journal=True).step()
+    assert marker.read_text() == "x\nx\n"
@@ -0,0 +1,38 @@
+
+import os
+import subprocess
+import sys
+
+READIES = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+LASTVER = os.path.join(READIES, "bin", "lastver")
+
+LINES = "redis-6.2.14.tgz\nredis-7.2.4.tgz\nredis-7.10.0.tgz\nredis-7.2.10.tgz\nREADME\n"
+
+def lastver(*args):
+    return subprocess.run([sys.executable, LASTVER] + list(args), input=LINES, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, universal_newlines=True)
+
+#----------------------------------------------------------------------------------------------
+
+def test_last_version():
+    assert lastver().stdout == "redis-7.10.0.tgz\n"
+
+def test_top_per_minor():
+    assert lastver("-n", "1", "--per", "minor").stdout.split() == \
+        ["redis-7.10.0.tgz", "redis-7.2.10.tgz", "redis-6.2.14.tgz"]
+
+def test_regex_with_named_group():
+    assert lastver("-r", r"redis-(?P<version>7\.2\.\d+)").stdout == "redis-7.2.10.tgz\n"
+
+def test_regex_without_groups():
+    assert lastver("-r", r"6\.\d+\.\d+").stdout == "redis-6.2.14.tgz\n"
+
+def test_invalid_regex():
+    res = lastver("-r", "(")
+    assert res.returncode == 2 and "invalid regex" in res.stderr
+
+def test_top_below_one():
+    for n in ("0", "-1"):
+        p = lastver("-n", n)
+        assert p.returncode == 2 and p.stdout == ""
+        assert "at least 1" in p.stderr
@@ -0,0 +1,35 @@
+
+import paella
+
+#----------------------------------------------------------------------------------------------
+
+def new_setup(monkeypatch, **kwargs):
+    for var in ['READIES_PIP_BATCH', 'READIES_WHEELHOUSE', 'VIRTUAL_ENV']:
+        monkeypatch.delenv(var, raising=False)
+    s = paella.Setup(nop=True, sudo=False, **kwargs)
+    s.commands = []
+    s.run = lambda cmd, **kw: s.commands.append(cmd) or 0
+    return s
+
+def test_pip_install_is_immediate_by_default(monkeypatch):
+    s = new_setup(monkeypatch)
+    s.hook = 'linux'
+    s.pip_install("redis")
+    assert len(s.commands) == 1 and s.commands[0].endswith(" redis")
+    assert not s.pip_deferred
+
+def test_pip_batch_defers_within_hooks(monkeypatch):
+    s = new_setup(monkeypatch, pip_batch=True)
+    s.hook = 'linux'
+    s.pip_install("redis")
+    s.pip_install("ramp-packer RLTest")
+    assert s.commands == []
+    s.flush_pip()
+    assert len(s.commands) == 1 and s.commands[0].endswith(" redis ramp-packer RLTest")
+
+def test_pip_batch_from_environment(monkeypatch):
+    new_setup(monkeypatch)
+    monkeypatch.setenv('READIES_PIP_BATCH', '1')
+    monkeypatch.setenv('READIES_WHEELHOUSE', '1')
+    s = paella.Setup(sudo=False)
+    assert s.pip_batch and s.wheelhouse is True
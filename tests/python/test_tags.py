@@ -0,0 +1,112 @@
+
+import hashlib
+import http.client
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+import paella.tags
+from paella.tags import GithubTags
+
+#----------------------------------------------------------------------------------------------
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+class _GithubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        u = urlparse(self.path)
+        q = parse_qs(u.query)
+        page, n = int(q['page'][0]), int(q['per_page'][0])
+        server.requests.append((page, self.headers.get('If-None-Match')))
+        tags = sorted(server.tags)  # GitHub lists tags by name
+        body = json.dumps([{'name': t} for t in tags[(page - 1) * n:page * n]]).encode()
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        last = max(1, (len(tags) + n - 1) // n)
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        if last > 1:
+            self.send_header('Link', '<%s%s?per_page=%d&page=%d>; rel="last"' % (server.url, u.path, n, last))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def github(no_proxy_env, cache_root):
+    server = _Server(("127.0.0.1", 0), _GithubHandler)
+    server.url = "http://127.0.0.1:%d" % server.server_address[1]
+    server.tags = ["v1.%03d" % i for i in range(0, 250)]
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def gh_tags(github, **kwargs):
+    return GithubTags("org", "repo", api=github.url, **kwargs)
+
+#----------------------------------------------------------------------------------------------
+
+def test_fetch_and_cache(github):
+    assert gh_tags(github).names() == sorted(github.tags)
+    assert sorted(github.requests) == [(1, None), (2, None), (3, None)]
+    github.requests = []
+    assert gh_tags(github).names() == sorted(github.tags)
+    assert github.requests == []
+
+def test_revalidates_every_page(github):
+    gh_tags(github).names()
+    github.requests = []
+    assert gh_tags(github, ttl=0).names() == sorted(github.tags)
+    assert sorted(page for page, etag in github.requests) == [1, 2, 3]
+    assert all(etag is not None for page, etag in github.requests)
+
+def test_new_tag_on_later_page(github):
+    gh_tags(github).names()
+    github.tags.append("v1.150a")
+    assert "v1.150a" in gh_tags(github, ttl=0).names()
+
+def test_new_page(github):
+    github.tags = github.tags[0:200]
+    gh_tags(github).names()
+    github.tags.append("v2.0")
+    assert gh_tags(github, ttl=0).names()[-1] == "v2.0"
+
+def test_max_age(github):
+    gh_tags(github).names()
+    github.requests = []
+    gh_tags(github, ttl=0, max_age=0).names()
+    assert all(etag is None for page, etag in github.requests)
+
+def test_cache_is_per_api(github):
+    assert gh_tags(github).cache_file != GithubTags("org", "repo", api=github.url + "/v3").cache_file
+
+def test_retry_on_disconnect(github, monkeypatch):
+    http_get = paella.tags.http_get
+    failures = [2]
+
+    def flaky_get(url, headers={}):
+        if failures[0] > 0:
+            failures[0] -= 1
+            raise http.client.RemoteDisconnected("Remote end closed connection without response")
+        return http_get(url, headers=headers)
+
+    monkeypatch.setattr(paella.tags, 'http_get', flaky_get)
+    monkeypatch.setattr(paella.tags, 'DISCONNECT_PAUSE', 0)
+    assert gh_tags(github).names() == sorted(github.tags)
@@ -0,0 +1,87 @@
+
+import threading
+import time
+
+import pytest
+
+import paella
+from paella.tasks import Tasks
+
+#----------------------------------------------------------------------------------------------
+
+class Hooks(object):
+    def __init__(self):
+        self.log = []
+        self.lock = threading.Lock()
+
+    def record(self, what):
+        with self.lock:
+            self.log.append(what)
+
+    def common_first(self):
+        pass
+
+    def linux(self):
+        pass
+
+def run_hooks(obj, tasks, hooks):
+    tasks.start()
+    for name in hooks:
+        getattr(obj, name)()
+        tasks.hook_done(name)
+    tasks.finish()
+
+#----------------------------------------------------------------------------------------------
+
+def test_decorated_tasks_run_after_dependencies():
+    class S(Hooks):
+        @paella.task()
+        def a(self):
+            time.sleep(0.05)
+            self.record('a')
+
+        @paella.task(after=['a', 'linux'])
+        def b(self):
+            self.record('b')
+
+        def linux(self):
+            self.record('linux')
+
+    s = S()
+    run_hooks(s, Tasks(s), ['common_first', 'linux'])
+    assert s.log.index('b') > s.log.index('a')
+    assert s.log.index('b') > s.log.index('linux')
+
+def test_task_added_by_hook_without_decorated_tasks():
+    class S(Hooks):
+        def linux(self):
+            tasks.add('late', lambda: self.record('late'), after='common_first')
+
+    s = S()
+    tasks = Tasks(s)
+    run_hooks(s, tasks, ['common_first', 'linux'])
+    assert s.log == ['late']
+
+def test_task_added_by_setup_hook():
+    class SystemSetup(paella.Setup):
+        def __init__(self):
+            paella.Setup.__init__(self, nop=True, sudo=False)
+            self.ran = []
+
+        def linux(self):
+            self.add_task('late', lambda: self.ran.append('late'))
+
+    s = SystemSetup()
+    s.invoke()
+    assert s.ran == ['late']
+
+def test_invalid_dependency_of_added_task():
+    class S(Hooks):
+        def linux(self):
+            tasks.add('bad', lambda: None, after='no_such_hook')
+
+    s = S()
+    tasks = Tasks(s)
+    with pytest.raises(paella.Error):
+        run_hooks(s, tasks, ['common_first', 'linux'])
+    tasks.finish()
@@ -0,0 +1,67 @@
+
+import os
+import random
+import time
+
+import pytest
+
+from paella.contrib.version import Version, _cached_parse
+
+# Sorting versions should not construct Version objects nor compare identifier objects
+# (see Version.sort_strings). The budget (in ms) for sorting 20,000 fresh version strings can be
+# set with READIES_VERSION_SORT_BUDGET_MS.
+SORT_BUDGET_MS = float(os.environ.get('READIES_VERSION_SORT_BUDGET_MS', '500'))
+
+def random_versions(n, seed=1):
+    rnd = random.Random(seed)
+    versions = []
+    for _ in range(0, n):
+        v = "%d.%d.%d" % (rnd.randint(0, 9), rnd.randint(0, 30), rnd.randint(0, 300))
+        r = rnd.random()
+        if r < 0.1:
+            v += "-rc%d" % rnd.randint(1, 5)
+        elif r < 0.2:
+            v += "-alpha.%d" % rnd.randint(0, 12)
+        elif r < 0.25:
+            v += "-%d" % rnd.randint(0, 12)
+        versions.append(("v" if rnd.random() < 0.3 else "") + v)
+    return versions
+
+def no_v(s):
+    return s[1:] if s.startswith('v') else s
+
+#----------------------------------------------------------------------------------------------
+
+def test_sort_matches_precedence():
+    versions = random_versions(3000)
+    expected = sorted(versions, key=lambda s: (Version(no_v(s)).precedence_key, s))
+    keyed = sorted(versions, key=lambda s: (Version.key_of(no_v(s)), s))
+    assert [Version(no_v(s)) for s in keyed] == [Version(no_v(s)) for s in expected]
+
+def test_sort_strings():
+    assert Version.sort_strings(["1.10.0", "1.2.0", "1.2.0-rc1", "bogus", "1.2.0-alpha.10", "1.2.0-alpha.9"]) == \
+        ["1.2.0-alpha.9", "1.2.0-alpha.10", "1.2.0-rc1", "1.2.0", "1.10.0"]
+    assert Version.max_of(["v7.2.4", "v7.10.0", "v7.2.10"], key=no_v) == "v7.10.0"
+
+def test_comparisons():
+    assert Version("1.2.3-rc1") < Version("1.2.3") < Version("1.2.10")
+    assert Version("1.2.3") == Version("1.2.3") and Version("1.2") < Version("1.2.1")
+
+def test_assigned_fields():
+    a = Version('6.2.5')
+    b = Version('6.1.9')
+    assert a > b
+    a.minor = 0
+    assert str(a) == "6.0.5"
+    assert a < b and sorted([b, a]) == [a, b]
+    a.prerelease = ('rc1',)
+    assert a < Version('6.0.5')
+
+def test_sort_benchmark():
+    versions = random_versions(20000, seed=2)
+    _cached_parse.cache_clear()
+    t0 = time.perf_counter()
+    result = Version.sort_strings(versions, key=no_v)
+    ms = (time.perf_counter() - t0) * 1000
+    assert len(result) == len(versions)
+    assert ms < SORT_BUDGET_MS, "sorting %d versions took %.0fms (budget: %.0fms)" % (len(versions), ms, SORT_BUDGET_MS)